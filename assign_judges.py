@@ -0,0 +1,202 @@
+import argparse
+import heapq
+import logging
+import os
+import numpy as np
+import pandas as pd
+from utils import JUDGE_COLUMNS, _build_student_assignments, resolve_judge_assignments
+
+# fills the Judge 1..N columns of student_assignments.csv from ids_judges.csv:
+#   python assign_judges.py data --judges-per-project 3 --conflicts data/conflicts.csv
+#
+# optional ids_judges.csv columns:
+#   CATEGORIES  categories the judge may judge, separated by ';' (blank = any category)
+#   CAPACITY    most projects the judge can take (blank = no limit)
+# conflicts.csv has JUDGE ID and ID (project) columns, one conflict of interest per row
+
+logger = logging.getLogger()
+
+
+def _split_categories(value):
+    if pd.isna(value) or not str(value).strip():
+        return None
+    return {category.strip() for category in str(value).split(';') if category.strip()}
+
+
+def assign_judges(projects, judges, judges_per_project=3, conflicts=(), existing=(), seed=0, occupied=None):
+    # projects: Student Project ID + Category; judges: Judge ID (+ Categories set/None, Capacity)
+    # conflicts / existing: iterables of (project id, judge id) pairs; existing picks are kept
+    # and count towards load; occupied: project id -> slots taken by judges not in `judges`.
+    # Returns the new (Student Project ID, Judge ID) pairs and the projects left short of
+    # judges_per_project.
+    #
+    # greedy: projects with the fewest eligible judges go first, and each takes the
+    # least-loaded eligible judges from its category's min-heap of (load, tiebreak, judge)
+    judge_ids = judges['Judge ID'].tolist()
+    position = {judge_id: j for j, judge_id in enumerate(judge_ids)}
+    categories = judges['Categories'].tolist() if 'Categories' in judges else [None] * len(judge_ids)
+    capacity = [np.inf if pd.isna(c) else int(c) for c in
+                (judges['Capacity'] if 'Capacity' in judges else [None] * len(judge_ids))]
+    conflicts = {(p, position[j]) for p, j in conflicts if j in position}
+    taken = {}
+    loads = [0] * len(judge_ids)
+    for p, j in existing:
+        if j in position:
+            taken.setdefault(p, set()).add(position[j])
+            loads[position[j]] += 1
+
+    # random tiebreak so equally loaded judges don't always come out in file order
+    tiebreak = np.random.default_rng(seed).permutation(len(judge_ids)).tolist()
+    eligible = {category: [j for j in range(len(judge_ids))
+                           if categories[j] is None or category in categories[j]]
+                for category in projects['Category'].unique()}
+    heaps = {category: [(loads[j], tiebreak[j], j) for j in members]
+             for category, members in eligible.items()}
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    order = projects.assign(Eligible=projects['Category'].map(lambda c: len(eligible[c])))
+    order = order.sort_values(['Eligible', 'Student Project ID'], kind='stable')
+
+    assigned, short = [], []
+    for project_id, category in zip(order['Student Project ID'], order['Category']):
+        heap = heaps[category]
+        already = taken.get(project_id, set())
+        need = judges_per_project - len(already) - (occupied or {}).get(project_id, 0)
+        picked, skipped = [], []
+        while heap and len(picked) < need:
+            load, rank, j = heapq.heappop(heap)
+            if load != loads[j]:
+                # stale entry, the judge took projects from another category's heap
+                heapq.heappush(heap, (loads[j], rank, j))
+            elif loads[j] >= capacity[j]:
+                # full, drop the judge from this heap for good
+                continue
+            elif j in already or (project_id, j) in conflicts:
+                skipped.append((load, rank, j))
+            else:
+                picked.append(j)
+        for j in picked:
+            loads[j] += 1
+            heapq.heappush(heap, (loads[j], tiebreak[j], j))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+
+        assigned.extend((project_id, judge_ids[j]) for j in picked)
+        if len(picked) < need:
+            short.append(project_id)
+
+    if short:
+        logger.warning(
+            f"{len(short)} project(s) could not get {judges_per_project} judges: {', '.join(short[:20])}")
+    return pd.DataFrame(assigned, columns=['Student Project ID', 'Judge ID']), short
+
+
+def read_judges(data_dir):
+    ids_judges = pd.read_csv(f"{data_dir}/ids_judges.csv")
+    judges = pd.DataFrame({
+        'Judge ID': ids_judges['JUDGE ID'].astype(str).str.strip().str.upper(),
+        'Name': ids_judges['FIRST'].astype(str).str.strip() + " " + ids_judges['LAST'].astype(str).str.strip(),
+    })
+    if 'CATEGORIES' in ids_judges:
+        judges['Categories'] = ids_judges['CATEGORIES'].map(_split_categories)
+    if 'CAPACITY' in ids_judges:
+        judges['Capacity'] = pd.to_numeric(ids_judges['CAPACITY'], errors='coerce')
+
+    duplicated = judges['Name'].str.upper().duplicated(keep=False)
+    if duplicated.any():
+        # assignments are written as names, so these judges could not be told apart
+        logger.warning(
+            f"Skipping judges with the same name: {', '.join(judges.loc[duplicated, 'Judge ID'])}")
+    return ids_judges, judges[~duplicated].drop_duplicates('Judge ID').reset_index(drop=True)
+
+
+def read_conflicts(path):
+    conflicts = pd.read_csv(path)
+    return list(zip(conflicts['ID (project)'].astype(str).str.strip().str.upper(),
+                    conflicts['JUDGE ID'].astype(str).str.strip().str.upper()))
+
+
+def generate_assignments(data_dir, judges_per_project=3, conflicts_path=None, keep_existing=True,
+                         output_path=None, seed=0):
+    # writes student_assignments.csv (or output_path) in the format the pipeline reads
+    if judges_per_project > len(JUDGE_COLUMNS):
+        raise ValueError(f"at most {len(JUDGE_COLUMNS)} judges per project are supported")
+    path = f"{data_dir}/student_assignments.csv"
+    raw = pd.read_csv(path)
+    student_assignments = _build_student_assignments(path)
+    ids_judges, judges = read_judges(data_dir)
+
+    projects = pd.DataFrame({
+        'Student Project ID': student_assignments['ID (project)'].astype(str).str.strip().str.upper(),
+        'Category': student_assignments['Category'].fillna(''),
+    }).drop_duplicates('Student Project ID')
+
+    # the judge cells as typed, per project in slot order
+    row_ids = raw['ID (project)'].astype(str).str.strip().str.upper().where(raw['ID (project)'].notna())
+    judge_cols = [col for col in JUDGE_COLUMNS if col in raw]
+    typed = {}
+    for project_id, cells in zip(row_ids, raw[judge_cols].itertuples(index=False, name=None)):
+        if isinstance(project_id, str):
+            typed.setdefault(project_id, []).extend(
+                cell for cell in cells if pd.notna(cell) and str(cell).strip())
+
+    existing, occupied = [], {}
+    if keep_existing:
+        resolved = resolve_judge_assignments(student_assignments, ids_judges)
+        existing = list(zip(resolved.assigned['Student Project ID'], resolved.assigned['Judge ID']))
+        # cells that match no single judge (not in ids_judges.csv yet, typos, ...) are kept in
+        # their slots and count toward the panel, an admin typed them for a reason
+        unresolved = resolved.issues[~resolved.issues['Resolved'] & (resolved.issues['Judge Name'] != '')]
+        occupied = unresolved.groupby('Student Project ID').size().to_dict()
+        if len(unresolved) > 0:
+            logger.warning(
+                f"Keeping {len(unresolved)} judge cell(s) that don't match ids_judges.csv, they count toward the panel:\n"
+                f"{unresolved[['Student Project ID', 'Judge Name', 'Issue']].to_string(index=False)}")
+    else:
+        cleared = sum(map(len, typed.values()))
+        if cleared:
+            logger.warning(f"Reassigning: cleared {cleared} judge cell(s) that were filled in")
+        typed = {}
+    conflicts = read_conflicts(conflicts_path) if conflicts_path else []
+    kept_conflicts = set(existing).intersection(conflicts)
+    if kept_conflicts:
+        logger.warning(
+            f"Kept assignments conflict with conflicts.csv (rerun with --reassign to replace them): {sorted(kept_conflicts)}")
+
+    new, short = assign_judges(projects, judges, judges_per_project, conflicts, existing, seed, occupied)
+
+    # kept cells first, then the new picks, in the rows of the original file (category rows etc. untouched)
+    names = dict(zip(judges['Judge ID'], judges['Name']))
+    panel = {project_id: list(cells) for project_id, cells in typed.items()}
+    for project_id, judge_id in new.itertuples(index=False, name=None):
+        panel.setdefault(project_id, []).append(names.get(judge_id, judge_id))
+    width = max([judges_per_project, *map(len, panel.values())])
+    for slot, col in enumerate(JUDGE_COLUMNS):
+        if slot < width or col in raw:
+            raw[col] = [panel[p][slot] if isinstance(p, str) and slot < len(panel.get(p, [])) else None
+                        for p in row_ids]
+
+    output_path = output_path or path
+    raw.to_csv(f"{output_path}.tmp", index=False)
+    os.replace(f"{output_path}.tmp", output_path)
+    logger.info(f"Assigned {len(new)} judge slot(s) across {len(projects)} projects, {len(short)} short")
+    return new, short
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Assign judges to projects and write the Judge columns of student_assignments.csv")
+    parser.add_argument("data_dir")
+    parser.add_argument("--judges-per-project", type=int, default=3)
+    parser.add_argument("--conflicts", help="csv of JUDGE ID, ID (project) pairs that must not be assigned")
+    parser.add_argument("--reassign", action="store_true",
+                        help="ignore judges already filled in instead of keeping them")
+    parser.add_argument("--output", help="write here instead of overwriting student_assignments.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+    new, short = generate_assignments(args.data_dir, args.judges_per_project, args.conflicts,
+                                      keep_existing=not args.reassign, output_path=args.output, seed=args.seed)
+    print(f"Assigned {len(new)} judge slot(s), {len(short)} project(s) short of judges")
@@ -0,0 +1,177 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from generate_fair import generate_fair
+from search_index import SearchIndex
+from utils import (AGGREGATION_STATE_FILE, STREAM_CHUNK_ROWS, build_judge_index, generate_csv,
+                   load_judge_assignments, read_output, verify_validity)
+from snapshot import SNAPSHOT_DIR
+
+# times each stage of the processing pipeline on a synthetic fair and appends the
+# results to a json-lines file so runs can be compared across versions
+
+# what st.py imports, i.e. what every new viewer process pays before the first page renders
+APP_IMPORTS = ["streamlit", "dotenv", "coordinator", "metrics", "placements", "sheet_sync", "store", "utils"]
+# only needed once a sync is requested, they must not be loaded by APP_IMPORTS
+LAZY_MODULES = ["gspread", "google.auth", "requests"]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _time(fn):
+    # (result, seconds)
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _peak(fn):
+    # (result, peak python-allocated MiB); tracemalloc slows the stage down several times,
+    # so this runs in a separate pass from the timing
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def measure_cold_start(repeat=5):
+    # fastest of `repeat` fresh interpreters importing the app's modules, plus any
+    # LAZY_MODULES that got imported along the way
+    code = (f"import sys, time; start = time.perf_counter(); import {', '.join(APP_IMPORTS)}; "
+            f"print(time.perf_counter() - start); "
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    seconds, eager = [], ""
+    for _ in range(repeat):
+        lines = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+        seconds.append(float(lines[0]))
+        eager = lines[1] if len(lines) > 1 else ""
+    print(f"{'cold import (app)':<28} {min(seconds):>9.3f}s")
+    if eager:
+        print(f"  loaded eagerly: {eager}")
+    return {'seconds': round(min(seconds), 4), 'eager': eager.split(",") if eager else []}
+
+
+def _clear_caches(data_dir):
+    shutil.rmtree(f"{data_dir}/{SNAPSHOT_DIR}", ignore_errors=True)
+    for fname in [AGGREGATION_STATE_FILE, "output.csv"]:
+        if os.path.exists(f"{data_dir}/{fname}"):
+            os.remove(f"{data_dir}/{fname}")
+
+
+def _run_stages(data_dir, measure):
+    # {stage: measure(stage)}, measure(fn) returns (fn's result, measurement)
+    measured = {}
+
+    def stage(name, fn):
+        result, measured[name] = measure(fn)
+        return result
+
+    _clear_caches(data_dir)
+    assignments = stage("resolve assignments (cold)",
+                        lambda: load_judge_assignments(data_dir))
+    final_df = stage("generate_csv (cold)",
+                     lambda: generate_csv(data_dir, assignments))
+    stage("resolve assignments (warm)",
+          lambda: load_judge_assignments(data_dir))
+    stage("generate_csv (warm)", lambda: generate_csv(data_dir, assignments))
+    stage("generate_csv (incremental)",
+          lambda: generate_csv(data_dir, assignments, incremental=True))
+    stage("generate_csv (streaming)", lambda: generate_csv(
+        data_dir, assignments, chunksize=STREAM_CHUNK_ROWS))
+    stage("verify_validity", lambda: verify_validity(
+        final_df, data_dir, assignments))
+    output_df = stage("read output", lambda: read_output(data_dir))
+    stage("judge index", lambda: build_judge_index(output_df))
+    stage("student search index", lambda: SearchIndex(
+        output_df, ['Student Name', 'Student Project ID', 'Title of Presentation']))
+    return measured
+
+
+def run_benchmark(data_dir):
+    seconds = _run_stages(data_dir, _time)
+    peaks = _run_stages(data_dir, _peak)
+    stages = {}
+    for name in seconds:
+        stages[name] = {'seconds': round(seconds[name], 4), 'peak_mib': round(peaks[name], 1)}
+        print(f"{name:<28} {seconds[name]:>9.3f}s {peaks[name]:>9.1f} MiB")
+    return stages
+
+
+def _previous_run(results_path, sizes):
+    if not os.path.exists(results_path):
+        return None
+    previous = None
+    with open(results_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['sizes'] == sizes:
+                previous = record
+    return previous
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the processing pipeline on a synthetic fair")
+    parser.add_argument("--projects", type=int, default=10_000)
+    parser.add_argument("--judges", type=int, default=2_000)
+    parser.add_argument("--score-rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="benchmark a copy of an existing data directory instead, it is left untouched")
+    parser.add_argument("--imports-only", action="store_true",
+                        help="only time the cold import of the streamlit app's modules")
+    parser.add_argument("--results", default="benchmark_results.jsonl",
+                        help="json-lines file the run is appended to")
+    args = parser.parse_args()
+
+    # the synthetic data is deliberately messy, don't time (or print) thousands of warnings
+    logging.disable(logging.CRITICAL)
+
+    sizes = {'projects': args.projects, 'judges': args.judges,
+             'score_rows': args.score_rows, 'seed': args.seed}
+    stages = {'cold import (app)': measure_cold_start()}
+    if args.imports_only:
+        sizes = {'imports_only': True}
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_dir = f"{tmp_dir}/fair"
+            if args.data_dir is None:
+                generate_fair(data_dir, projects=args.projects, judges=args.judges,
+                              score_rows=args.score_rows, seed=args.seed)
+            else:
+                # run_benchmark clears the caches and rewrites the outputs, so it gets a copy
+                shutil.copytree(args.data_dir, data_dir, ignore=shutil.ignore_patterns(SNAPSHOT_DIR))
+                sizes = {'data_dir': os.path.abspath(args.data_dir)}
+            stages.update(run_benchmark(data_dir))
+
+    previous = _previous_run(args.results, sizes)
+    if previous is not None:
+        print(f"\ncompared to {previous['revision']} ({previous['timestamp']}):")
+        for name, result in stages.items():
+            if name in previous['stages'] and previous['stages'][name]['seconds'] > 0:
+                ratio = result['seconds'] / previous['stages'][name]['seconds']
+                print(f"{name:<28} {ratio:>9.2f}x")
+
+    with open(args.results, "a") as f:
+        f.write(json.dumps({
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'revision': _git_revision(),
+            'sizes': sizes,
+            'stages': stages,
+        }) + "\n")
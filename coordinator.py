@@ -0,0 +1,68 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future
+
+# single-flight processing: at most one fetch -> process -> upload job per data directory runs
+# at a time in this process. Every streamlit session and the background worker share the same
+# coordinator, and a request that arrives while a job is running waits for that job and gets
+# its result instead of starting a duplicate run. Requests after it finishes start a new job,
+# which returns right away when the sheet hasn't changed (see process_values).
+
+logger = logging.getLogger()
+
+_coordinators = {}
+_registry_lock = threading.Lock()
+
+
+def get_coordinator(data_dir):
+    # one coordinator per data directory for the whole process
+    key = os.path.abspath(data_dir)
+    with _registry_lock:
+        if key not in _coordinators:
+            _coordinators[key] = ProcessingCoordinator(data_dir)
+        return _coordinators[key]
+
+
+class ProcessingCoordinator:
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        # Future of the running job, None when idle
+        self._running = None
+        # jobs actually run / requests that were served by someone else's job
+        self.runs = 0
+        self.joined = 0
+
+    @property
+    def busy(self):
+        return self._running is not None
+
+    def run(self, job):
+        # job() does the work; returns (its result, True if the result came from a job another
+        # caller had already started). Exceptions are raised to every caller sharing the job.
+        with self._lock:
+            future = self._running
+            leader = future is None
+            if leader:
+                future = self._running = Future()
+                self.runs += 1
+            else:
+                self.joined += 1
+
+        if not leader:
+            logger.info(f"Processing of {self.data_dir} already running, waiting for its result")
+            return future.result(), True
+
+        try:
+            result = job()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._running = None
@@ -0,0 +1,115 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from utils import SCORING_COLUMNS, JUDGE_COLUMNS
+
+# synthetic fair data in the same format as data/, for benchmarking at realistic sizes
+
+FIRST_NAMES = [
+    "Aiko", "Boris", "Camille", "Darius", "Elena", "Farida", "Gabriel", "Hana", "Ibrahim", "Jasmine",
+    "Kenji", "Layla", "Marcus", "Nadia", "Omar", "Priya", "Quinn", "Reza", "Svetlana", "Tariq",
+    "Zoë", "José", "Mary Ann", "Jean-Luc", "Siobhan", "Wei", "Olu", "Ines", "Mateo", "Anya",
+]
+LAST_NAMES = [
+    "Tanaka", "Volkov", "Dupont", "Okonkwo", "Petrov", "Hussain", "Moreau", "Suzuki", "Al-Rashid", "Tran",
+    "Watanabe", "Mansouri", "Hendricks", "Sokolov", "Khalil", "Sharma", "Adebayo", "Tehrani", "Novak", "Benali",
+    "García", "O'Brien", "van der Berg", "Nguyen", "Kowalski", "Müller", "Smith", "Lee", "Patel", "Kim",
+]
+TITLE_WORDS = [
+    "ANALYSIS", "EFFECT", "OPTIMIZING", "MODELING", "NEURAL", "SOIL", "MICROPLASTIC", "GENE", "EXPRESSION",
+    "CARBON", "SEQUESTRATION", "TRAFFIC", "FLOW", "SLEEP", "MEMORY", "BIOFILM", "ALGORITHM", "SOLAR",
+    "EFFICIENCY", "WATER", "QUALITY", "URBAN", "PARKS", "PROTEIN", "FOLDING", "GRAPH", "NETWORKS",
+]
+
+
+def generate_fair(out_dir, projects=10_000, judges=2_000, score_rows=100_000, categories=25,
+                  judges_per_project=6, malformed_rate=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # judges with unique full names (double-barrelled last names widen the pool)
+    last_pool = LAST_NAMES + [f"{a}-{b}" for a in LAST_NAMES for b in LAST_NAMES if a != b]
+    picks = rng.choice(len(FIRST_NAMES) * len(last_pool), judges, replace=False)
+    first = np.array(FIRST_NAMES)[picks // len(last_pool)]
+    last = np.array(last_pool)[picks % len(last_pool)]
+    # ids like the sample data (AIT, HAS2, ...)
+    base_ids = pd.Series([f"{f[:2]}{l[0]}".upper() for f, l in zip(first, last)])
+    judge_ids = base_ids + base_ids.groupby(base_ids).cumcount().map(
+        lambda n: "" if n == 0 else str(n + 1))
+    ids_judges = pd.DataFrame(
+        {"FIRST": first, "LAST": last, "JUDGE ID": judge_ids})
+    ids_judges.to_csv(f"{out_dir}/ids_judges.csv", index=False)
+
+    # projects, grouped by category; Category is only filled on each category's first row
+    category_codes = [f"C{c:02d}" for c in range(categories)]
+    project_category = np.sort(rng.integers(0, categories, projects))
+    project_ids = pd.Series(project_category).groupby(project_category).cumcount() + 1
+    project_ids = [f"{category_codes[c]}{n:04d}" for c, n in zip(project_category, project_ids)]
+    category_names = np.array([f"Category {c} ({code})" for c, code in enumerate(category_codes)])
+    category_col = np.where(np.r_[True, project_category[1:] != project_category[:-1]],
+                            category_names[project_category], None)
+
+    # each category gets its own judge pool, projects draw their panel from it
+    judge_names = ids_judges["FIRST"] + " " + ids_judges["LAST"]
+    pools = np.array_split(rng.permutation(judges), categories)
+    assigned = np.stack([rng.choice(pools[c], judges_per_project, replace=len(pools[c]) < judges_per_project)
+                         for c in project_category])
+    assigned_names = judge_names.to_numpy()[assigned].astype(object)
+
+    # malformed cells: stray whitespace, lowercase, missing last name, unknown judge
+    malformed = rng.random(assigned_names.shape) < malformed_rate
+    kinds = rng.integers(0, 4, assigned_names.shape)
+    for (i, j) in zip(*np.nonzero(malformed)):
+        name = assigned_names[i, j]
+        assigned_names[i, j] = [f"  {name} ", name.lower(), name.split(" ")[0],
+                                "Unknown Judge"][kinds[i, j]]
+
+    student_first = rng.choice(FIRST_NAMES, projects)
+    student_last = rng.choice(LAST_NAMES, projects)
+    titles = [" ".join(words) for words in rng.choice(TITLE_WORDS, (projects, 6))]
+    student_assignments = pd.DataFrame({
+        "Category": category_col,
+        "ID (project)": project_ids,
+        "Student Last Name": student_last,
+        "Student First Name": student_first,
+        "Title of Presentation": titles,
+        **{col: assigned_names[:, j] for j, col in enumerate(JUDGE_COLUMNS[:judges_per_project])},
+    })
+    student_assignments.to_csv(
+        f"{out_dir}/student_assignments.csv", index=False)
+
+    # score rows, mostly from assigned judges, a few walk-ins
+    row_project = rng.integers(0, projects, score_rows)
+    row_judge = assigned[row_project, rng.integers(0, judges_per_project, score_rows)]
+    walk_in = rng.random(score_rows) < 0.02
+    row_judge[walk_in] = rng.integers(0, judges, walk_in.sum())
+    row_judge_ids = judge_ids.to_numpy()[row_judge].astype(object)
+    row_project_ids = np.array(project_ids, dtype=object)[row_project]
+    # ids typed by hand in the form
+    sloppy = rng.random(score_rows) < malformed_rate
+    row_project_ids[sloppy] = [f" {pid.lower()}" for pid in row_project_ids[sloppy]]
+
+    raw_scores = pd.DataFrame({
+        "Judge ID": row_judge_ids,
+        "Student Project ID": row_project_ids,
+        **{col: rng.integers(5, 11, score_rows) for col in SCORING_COLUMNS},
+        "Other Comments (Enter N/A if not)": rng.choice(["N/A", "Great work!", "Clear presentation."], score_rows),
+        "Student Name": student_first[row_project] + " " + student_last[row_project],
+    })
+    raw_scores.to_csv(f"{out_dir}/raw_scores.csv", index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic fair (raw_scores.csv, student_assignments.csv, ids_judges.csv)")
+    parser.add_argument("out_dir")
+    parser.add_argument("--projects", type=int, default=10_000)
+    parser.add_argument("--judges", type=int, default=2_000)
+    parser.add_argument("--score-rows", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=25)
+    parser.add_argument("--malformed-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_fair(args.out_dir, projects=args.projects, judges=args.judges, score_rows=args.score_rows,
+                  categories=args.categories, malformed_rate=args.malformed_rate, seed=args.seed)
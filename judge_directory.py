@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from search_index import normalize_series
+
+# a fuzzy match (only ever a suggestion, see resolve_judge_assignments) needs at least
+# this trigram (Dice) similarity to the judge's name
+FUZZY_MIN_CONFIDENCE = 0.7
+# and must beat the next closest judge by this much, otherwise it's ambiguous
+FUZZY_MIN_MARGIN = 0.1
+
+
+def name_keys(names):
+    # "Mary-Ann  O'Brién" -> "maryannobrien", accents/case/spacing/punctuation don't matter;
+    # the word key sorts the words first so "O'Brien, Mary-Ann" finds the same judge
+    words = normalize_series(names)
+    return (words.str.replace(" ", "", regex=False),
+            words.str.split().map(lambda w: "".join(sorted(w))))
+
+
+def _grams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class JudgeDirectory:
+    # built once from ids_judges.csv: O(1) lookup by normalized full name, then by the
+    # words in any order, then a trigram index over the names for misspellings
+
+    def __init__(self, ids_judges):
+        ids = ids_judges['JUDGE ID'].astype(str).str.strip().str.upper()
+        judges = pd.DataFrame({
+            'Judge ID': ids,
+            'Name': ids_judges['FIRST'].fillna('').astype(str) + " " + ids_judges['LAST'].fillna('').astype(str),
+        })
+        judges['Key'], judges['Word Key'] = name_keys(judges['Name'])
+        judges = judges[judges['Key'] != ''].drop_duplicates(['Key', 'Judge ID'])
+
+        self.judge_ids = pd.Index(ids.unique())
+        self.by_key = judges.groupby('Key')['Judge ID'].agg(lambda x: tuple(sorted(set(x)))).to_dict()
+        self.by_word_key = judges.groupby('Word Key')['Judge ID'].agg(
+            lambda x: tuple(sorted(set(x)))).to_dict()
+
+        # trigram postings over the distinct keys, for the fuzzy fallback
+        self.keys = list(self.by_key)
+        key_grams = [_grams(key) for key in self.keys]
+        self.gram_counts = np.array([len(grams) for grams in key_grams])
+        postings = {}
+        for position, grams in enumerate(key_grams):
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.array(rows) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.judge_ids)
+
+    def fuzzy(self, key):
+        # (judge ids, confidence) of the closest name, several ids if it's too close to call
+        grams = _grams(key)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return (), 0.0
+        common = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        similarity = 2 * common / (len(grams) + self.gram_counts)
+        best = similarity.max()
+        if best < FUZZY_MIN_CONFIDENCE:
+            return (), round(float(best), 3)
+        close = np.flatnonzero(similarity > best - FUZZY_MIN_MARGIN)
+        ids = sorted({judge_id for position in close for judge_id in self.by_key[self.keys[position]]})
+        return tuple(ids), round(float(best), 3)
+
+    def resolve(self, names):
+        # names: series of judge name cells; returns Candidates (comma separated ids), Matches,
+        # Confidence (1.0 for exact lookups) and Match ('exact', 'reordered', 'fuzzy' or '')
+        unique = pd.Series(names.astype(str).unique())
+        keys, word_keys = name_keys(unique)
+        found = keys.map(self.by_key)
+        match = pd.Series(np.where(found.notna(), 'exact', ''), dtype=object)
+        confidence = pd.Series(np.where(found.notna(), 1.0, 0.0))
+
+        reordered = found.isna() & word_keys.isin(self.by_word_key.keys())
+        found[reordered] = word_keys[reordered].map(self.by_word_key)
+        match[reordered] = 'reordered'
+        confidence[reordered] = 1.0
+
+        # only the names that are still missing go through the trigram index, once per distinct key
+        missing = found.isna() & (keys != '')
+        fuzzy = {key: self.fuzzy(key) for key in keys[missing].unique()}
+        found[missing] = keys[missing].map(lambda key: fuzzy[key][0])
+        confidence[missing] = keys[missing].map(lambda key: fuzzy[key][1])
+        match[missing & found.map(bool, na_action='ignore').fillna(False).astype(bool)] = 'fuzzy'
+
+        found = found.map(lambda ids: ids if isinstance(ids, tuple) else ())
+        table = pd.DataFrame({
+            'Candidates': found.map(','.join).to_numpy(),
+            'Matches': found.map(len).to_numpy(),
+            'Confidence': confidence.to_numpy(),
+            'Match': match.to_numpy(),
+        }, index=unique)
+        return table.reindex(names.astype(str)).set_axis(names.index)
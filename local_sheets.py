@@ -0,0 +1,106 @@
+import csv
+from collections import Counter
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+# in-memory stand-in for the parts of the gspread client this project uses,
+# handy for running without a google account and for counting api calls
+
+
+class LocalWorksheet:
+    def __init__(self, spreadsheet, title, rows, cols, worksheet_id):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = worksheet_id
+        self.row_count = rows
+        self.col_count = cols
+        self.cells = {}
+
+    def _call(self, name):
+        self.spreadsheet.client.api_calls[name] += 1
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        if not self.cells:
+            return []
+        height = max(r for r, _ in self.cells) + 1
+        width = max(c for _, c in self.cells) + 1
+        return [[self.cells.get((r, c), "") for c in range(width)] for r in range(height)]
+
+    def _write(self, range_name, values):
+        grid = a1_range_to_grid_range(range_name)
+        top, left = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        width = max((len(row) for row in values), default=0)
+        if top + len(values) > self.row_count or left + width > self.col_count:
+            # the real api rejects writes outside the grid too
+            raise ValueError(
+                f"range {range_name} exceeds grid limits of {self.title}")
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                if value == "":
+                    self.cells.pop((top + i, left + j), None)
+                else:
+                    self.cells[(top + i, left + j)] = str(value)
+
+    def update(self, values, range_name, value_input_option=None):
+        self._call("update")
+        self._write(range_name, values)
+
+    def batch_update(self, data, value_input_option=None):
+        self._call("batch_update")
+        for entry in data:
+            self._write(entry["range"], entry["values"])
+
+    def resize(self, rows=None, cols=None):
+        self._call("resize")
+        self.row_count = rows if rows is not None else self.row_count
+        self.col_count = cols if cols is not None else self.col_count
+        self.cells = {(r, c): v for (r, c), v in self.cells.items()
+                      if r < self.row_count and c < self.col_count}
+
+
+class LocalSpreadsheet:
+    def __init__(self, client):
+        self.client = client
+        self.worksheets = {}
+        # like real sheet ids, never reused after a worksheet is deleted
+        self.last_id = 0
+
+    def _next_id(self):
+        self.last_id += 1
+        return self.last_id
+
+    def worksheet(self, title):
+        self.client.api_calls["worksheet"] += 1
+        if title not in self.worksheets:
+            raise WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows, cols):
+        self.client.api_calls["add_worksheet"] += 1
+        self.worksheets[title] = LocalWorksheet(
+            self, title, rows, cols, self._next_id())
+        return self.worksheets[title]
+
+    def del_worksheet(self, worksheet):
+        self.client.api_calls["del_worksheet"] += 1
+        del self.worksheets[worksheet.title]
+
+
+class LocalSheetsClient:
+    # sheets maps worksheet title -> csv path used to seed it
+    def __init__(self, sheets=None):
+        self.api_calls = Counter()
+        self.spreadsheet = LocalSpreadsheet(self)
+        for title, path in (sheets or {}).items():
+            with open(path, newline="") as f:
+                values = list(csv.reader(f))
+            worksheet = LocalWorksheet(self.spreadsheet, title, max(len(values), 1),
+                                       max((len(row) for row in values), default=1),
+                                       self.spreadsheet._next_id())
+            worksheet._write("A1", values)
+            self.spreadsheet.worksheets[title] = worksheet
+
+    def open_by_key(self, key):
+        self.api_calls["open_by_key"] += 1
+        return self.spreadsheet
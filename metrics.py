@@ -0,0 +1,94 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger()
+
+# one json object per line: a "span" record per pipeline stage, then a "run" record
+METRICS_FILE = "metrics.jsonl"
+
+# spans are attached to the run active on the current thread (ui script or sync worker)
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def span(stage, rows=None):
+    # time one stage; set record['rows'] inside the block once the count is known
+    record = {'stage': stage, 'rows': rows}
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        run = getattr(_local, 'run', None)
+        if run is not None:
+            run['spans'].append(record)
+        rows = f" ({record['rows']} rows)" if record['rows'] is not None else ""
+        logger.info(f"stage {stage}: {record['seconds']:.3f}s{rows}")
+
+
+@contextmanager
+def pipeline_run(data_dir, trigger):
+    # groups the spans of one fetch -> ... -> upload pass and appends them to METRICS_FILE;
+    # callers set run['processed'] = False for polls that found nothing new, those are only
+    # logged so an idle fair costs no disk writes
+    run = {'run_id': uuid.uuid4().hex[:12], 'time': time.time(),
+           'trigger': trigger, 'status': 'ok', 'processed': True, 'spans': []}
+    previous = getattr(_local, 'run', None)
+    _local.run = run
+    start = time.perf_counter()
+    try:
+        yield run
+    except Exception as e:
+        run['status'] = type(e).__name__
+        raise
+    finally:
+        run['seconds'] = round(time.perf_counter() - start, 4)
+        _local.run = previous
+        if run['processed']:
+            _append_run(data_dir, run)
+        else:
+            logger.info(f"{run['trigger']} poll found nothing new ({run['seconds']:.3f}s)")
+
+
+def _append_run(data_dir, run):
+    lines = [{'type': 'span', 'run_id': run['run_id'], 'time': run['time'], **record}
+             for record in run['spans']]
+    lines.append({'type': 'run', **{k: v for k, v in run.items() if k != 'spans'}})
+    try:
+        with _write_lock, open(f"{data_dir}/{METRICS_FILE}", "a") as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+    except OSError as e:
+        # metrics must never break processing
+        logger.warning(f"Could not write metrics: {e}")
+
+
+def read_runs(data_dir, limit=20):
+    # the last `limit` runs with their spans, newest first
+    try:
+        with open(f"{data_dir}/{METRICS_FILE}") as f:
+            # only the tail matters, a fair day can log thousands of runs
+            lines = deque(f, maxlen=limit * 50)
+    except FileNotFoundError:
+        return []
+
+    spans, runs = {}, []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # half-written line from a crashed process
+            continue
+        if record.get('type') == 'span':
+            spans.setdefault(record['run_id'], []).append(record)
+        elif record.get('type') == 'run':
+            runs.append({**record, 'spans': spans.pop(record['run_id'], [])})
+    return runs[::-1][:limit]
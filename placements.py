@@ -0,0 +1,72 @@
+import argparse
+import logging
+import pandas as pd
+from utils import (SCORING_COLUMNS, _write_atomic, attach_student_names, build_score_tensor, load_judge_assignments,
+                   read_output, read_scores, read_student_assignments, sort_placements)
+
+# top-N placements per category straight from the aggregated results:
+#   python placements.py data --top 3 --min-judges 3 --tie-breaker "Presentation Skills [Delivery]"
+
+logger = logging.getLogger()
+
+PLACEMENTS_FILE = "placements_new.csv"
+PLACEMENT_COLUMNS = ['prize winner', 'place', 'Student Project ID', 'Student First Name', 'Student Last Name',
+                     'Title of Presentation', 'Average Total Score', 'Judges Num']
+
+
+def compute_placements(final_df, student_assignments, top_n=3, min_judges=1, tie_breakers=(),
+                       criterion_means=None):
+    # final_df: output.csv rows; tie_breakers: SCORING_COLUMNS compared in order (higher wins)
+    # when Average Total Scores are equal, criterion_means is indexed by Student Project ID.
+    # Projects still tied after every tie-breaker share a place.
+    tie_breakers = list(tie_breakers)
+    candidates = final_df[(final_df['Judges Num'] >= min_judges)
+                          & final_df['Average Total Score'].notna()].copy()
+    if tie_breakers:
+        candidates = candidates.join(criterion_means[tie_breakers], on='Student Project ID')
+
+    keys = ['Average Total Score', *tie_breakers]
+    candidates = candidates.sort_values(
+        ['Category', *keys], ascending=[True] + [False] * len(keys), kind='stable')
+
+    # competition ranking (1, 2, 2, 4) within each category, on the full sort key
+    position = candidates.groupby('Category', sort=False).cumcount() + 1
+    new_key = (candidates[['Category', *keys]] != candidates[['Category', *keys]].shift()).any(axis=1)
+    candidates['place'] = position.where(new_key).ffill().astype(int)
+
+    placements = candidates[candidates['place'] <= top_n].rename(columns={'Category': 'prize winner'})
+    placements = attach_student_names(placements, student_assignments)
+    return sort_placements(placements[PLACEMENT_COLUMNS + tie_breakers]).reset_index(drop=True)
+
+
+def criterion_means(tensor):
+    # per-criterion mean of every project, for tie-breaking
+    return pd.DataFrame(tensor.project_means(), index=tensor.project_ids, columns=tensor.criteria)
+
+
+def generate_placements(data_dir, top_n=3, min_judges=1, tie_breakers=()):
+    unknown = [col for col in tie_breakers if col not in SCORING_COLUMNS]
+    if unknown:
+        raise ValueError(f"tie-breakers must be scoring columns, got {unknown}")
+    placements = compute_placements(
+        read_output(data_dir), read_student_assignments(data_dir), top_n, min_judges, tie_breakers,
+        criterion_means(build_score_tensor(read_scores(data_dir), load_judge_assignments(data_dir)))
+        if tie_breakers else None)
+    _write_atomic(f"{data_dir}/{PLACEMENTS_FILE}", lambda f: placements.to_csv(f, index=False))
+    return placements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=f"Compute the top placements per category from output.csv and write {PLACEMENTS_FILE}")
+    parser.add_argument("data_dir")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--min-judges", type=int, default=1,
+                        help="projects scored by fewer judges can't place")
+    parser.add_argument("--tie-breaker", action="append", default=[],
+                        help="scoring column to break ties on, can be repeated (applied in order)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s:%(message)s")
+    placements = generate_placements(args.data_dir, args.top, args.min_judges, args.tie_breaker)
+    print(placements.to_string(index=False))
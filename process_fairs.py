@@ -0,0 +1,103 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from metrics import pipeline_run
+from utils import VALIDITY_ISSUES_FILE, generate_csv, load_judge_assignments, verify_validity
+
+# headless processing of several fairs / divisions, one data directory each:
+#   python process_fairs.py data/junior data/senior data/regional --summary summary.json
+# exits 1 if any fair fails validation or can't be processed (for cron)
+
+logger = logging.getLogger()
+
+
+def process_fair(data_dir, incremental=True, verify=True, chunksize=None):
+    # runs in a worker process; never raises, failures end up in the summary
+    start = time.perf_counter()
+    summary = {'data_dir': data_dir, 'status': 'passed', 'projects': 0,
+               'errors': 0, 'warnings': 0, 'message': '', 'stages': {}}
+    try:
+        with pipeline_run(data_dir, "cli") as run:
+            assignments = load_judge_assignments(data_dir)
+            final_df = generate_csv(data_dir, assignments, incremental=incremental, chunksize=chunksize)
+            summary['projects'] = len(final_df)
+            if verify and not verify_validity(final_df, data_dir, assignments):
+                summary['status'] = 'failed'
+        if verify:
+            severities = pd.read_csv(f"{data_dir}/{VALIDITY_ISSUES_FILE}")['Severity']
+            summary['errors'] = int((severities == 'error').sum())
+            summary['warnings'] = int((severities == 'warning').sum())
+    except Exception as e:
+        logger.error(f"Processing {data_dir} failed: {e}")
+        summary['status'] = 'error'
+        summary['message'] = f"{type(e).__name__}: {e}"
+    else:
+        for record in run['spans']:
+            summary['stages'][record['stage']] = summary['stages'].get(
+                record['stage'], 0) + record['seconds']
+    summary['seconds'] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def configure_logging(log_file, level="INFO"):
+    # the issue tables are long, they go to the log file and stdout only gets the summary
+    logging.basicConfig(filename=log_file, level=level.upper(),
+                        format="%(levelname)s:%(message)s", force=True)
+
+
+def process_fairs(data_dirs, workers=None, incremental=True, verify=True, chunksize=None,
+                  log_file=None, log_level="INFO"):
+    # one fair per process, results in the order the directories were given
+    workers = min(workers or os.cpu_count() or 1, len(data_dirs))
+    args = [(data_dir, incremental, verify, chunksize) for data_dir in data_dirs]
+    if workers <= 1:
+        return [process_fair(*arg) for arg in args]
+    # workers may be spawned rather than forked, so logging is set up again in each one
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_logging,
+                             initargs=(log_file, log_level)) as pool:
+        return list(pool.map(process_fair, *zip(*args)))
+
+
+def format_summary(results):
+    table = pd.DataFrame(results, columns=[
+        'data_dir', 'status', 'projects', 'errors', 'warnings', 'seconds', 'message'])
+    return table.to_string(index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Process and validate the scores of one or more fairs (one data directory each)")
+    parser.add_argument("data_dirs", nargs="+")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--full", action="store_true",
+                        help="rebuild every output from scratch instead of incrementally")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="skip validity checks")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream raw_scores.csv this many rows at a time (bounded memory for very large files)")
+    parser.add_argument("--summary", help="write the combined summary to this json file")
+    parser.add_argument("--log-file", default="science_fair_judging.log")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    configure_logging(args.log_file, args.log_level)
+
+    missing = [d for d in args.data_dirs if not os.path.isdir(d)]
+    if missing:
+        parser.error(f"not a directory: {', '.join(missing)}")
+
+    results = process_fairs(args.data_dirs, workers=args.workers, incremental=not args.full,
+                            verify=not args.no_verify, chunksize=args.chunksize, log_file=args.log_file, log_level=args.log_level)
+    print(format_summary(results))
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump({'timestamp': time.time(), 'fairs': results}, f, indent=2)
+
+    sys.exit(0 if all(result['status'] == 'passed' for result in results) else 1)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# array-backed view of a fair's scores: projects and judges are integer codes into
+# project_ids / judge_ids, each submitted score row is one entry of a sparse
+# (project, judge, criterion) tensor, and assignments are sorted project*judge keys
+
+
+def _sorted_unique(keys):
+    keys = np.sort(keys)
+    return keys[np.r_[True, keys[1:] != keys[:-1]][:len(keys)]]
+
+
+class ScoreTensor:
+
+    def __init__(self, project_ids, judge_ids, criteria, entry_project, entry_judge, scores, assigned_keys):
+        self.project_ids = project_ids
+        self.judge_ids = judge_ids
+        self.criteria = list(criteria)
+        # one entry per score row; scores is (entries, criteria) float32, NaN where left blank
+        self.entry_project = entry_project
+        self.entry_judge = entry_judge
+        self.scores = scores
+        # sorted unique project * n_judges + judge, the assigned-judge membership matrix
+        self.assigned_keys = assigned_keys
+
+    @classmethod
+    def from_frames(cls, scores, assigned, criteria, project_ids=(), judge_ids=()):
+        # scores: normalized score rows (Student Project ID, Judge ID, criteria...),
+        # assigned: long (Student Project ID, Judge ID) table of resolved assignments
+        project_index = pd.Index(sorted(set(project_ids).union(
+            scores['Student Project ID'], assigned['Student Project ID'])))
+        judge_index = pd.Index(sorted(set(judge_ids).union(
+            scores['Judge ID'], assigned['Judge ID'])))
+        n_judges = max(len(judge_index), 1)
+        assigned_keys = (project_index.get_indexer(assigned['Student Project ID']).astype(np.int64) * n_judges
+                         + judge_index.get_indexer(assigned['Judge ID']))
+        return cls(
+            project_index, judge_index, criteria,
+            entry_project=project_index.get_indexer(scores['Student Project ID']).astype(np.int32),
+            entry_judge=judge_index.get_indexer(scores['Judge ID']).astype(np.int32),
+            scores=scores[list(criteria)].to_numpy(dtype=np.float32),
+            assigned_keys=_sorted_unique(assigned_keys),
+        )
+
+    def _keys(self, projects, judges):
+        return projects.astype(np.int64) * max(len(self.judge_ids), 1) + judges
+
+    def _split(self, keys):
+        n_judges = max(len(self.judge_ids), 1)
+        return keys // n_judges, keys % n_judges
+
+    def project_means(self):
+        # (projects, criteria) float64, NaN where a project has no score for a criterion
+        n_projects = len(self.project_ids)
+        means = np.full((n_projects, len(self.criteria)), np.nan)
+        for j in range(len(self.criteria)):
+            present = ~np.isnan(self.scores[:, j])
+            counts = np.bincount(self.entry_project[present], minlength=n_projects)
+            sums = np.bincount(self.entry_project[present], self.scores[present, j], minlength=n_projects)
+            np.divide(sums, counts, out=means[:, j], where=counts > 0)
+        return means
+
+    def average_totals(self):
+        # same definition as output.csv: the sum of the per-criterion means
+        return self.project_means().sum(axis=1)
+
+    def entry_totals(self):
+        # total of each submitted score row, NaN if any criterion was left blank
+        return self.scores.sum(axis=1, dtype=np.float64)
+
+    def scored_keys(self):
+        return _sorted_unique(self._keys(self.entry_project, self.entry_judge))
+
+    def pending_keys(self):
+        return self.assigned_keys[~np.isin(self.assigned_keys, self.scored_keys(), assume_unique=True)]
+
+    def judge_stats(self):
+        # per judge: entries, mean total, and bias = how far the judge's totals sit from the
+        # average total of the same projects (positive = scores higher than the other judges)
+        n_judges = len(self.judge_ids)
+        totals = self.entry_totals()
+        valid = ~np.isnan(totals)
+        project_average = self.average_totals()[self.entry_project]
+        deviation = totals - project_average
+        entries = np.bincount(self.entry_judge, minlength=n_judges)
+        scored = np.bincount(self.entry_judge[valid], minlength=n_judges)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_total = np.bincount(self.entry_judge[valid], totals[valid], minlength=n_judges) / scored
+            bias = np.bincount(self.entry_judge[valid], deviation[valid], minlength=n_judges) / scored
+        return pd.DataFrame({
+            'Entries': entries,
+            'Mean Total': mean_total.round(3),
+            'Bias': bias.round(3),
+            'Pending': np.bincount(self._split(self.pending_keys())[1], minlength=n_judges),
+        }, index=self.judge_ids.rename('Judge ID'))
@@ -0,0 +1,138 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# minimum share of query trigrams a record must contain to be returned
+MIN_SIMILARITY = 0.5
+
+
+COMBINING_MARKS = "[\u0300-\u036f]"
+# punctuation/whitespace in any script, letters of non-latin scripts are kept as they are; compiled so
+# pandas uses python's unicode-aware re (\W is ascii-only in the arrow string backend)
+NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_text(text):
+    # "Al-Rashid" -> "al rashid", "Dupônt" -> "dupont", "Волкова" -> "волкова"
+    text = re.sub(COMBINING_MARKS, "", unicodedata.normalize("NFKD", str(text)))
+    return NON_ALNUM.sub(" ", text.casefold()).strip()
+
+
+def normalize_series(values):
+    # vectorized normalize_text for whole columns
+    values = values.fillna("").astype(str).str.normalize("NFKD")
+    values = values.str.replace(COMBINING_MARKS, "", regex=True).str.casefold()
+    return values.str.replace(NON_ALNUM, " ", regex=True).str.strip()
+
+
+def _tokens(word):
+    # also index letter/digit runs so "02" finds "APS02"
+    if word.isalpha() or word.isdigit():
+        return [word]
+    return [word, *re.findall(r"[^\W\d_]+|\d+", word)]
+
+
+def _trigrams(token, pad_end=True):
+    # leading padding makes prefixes count, trailing padding rewards whole words
+    padded = f"  {token} " if pad_end else f"  {token}"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _short_grams(word):
+    # every distinct 1- and 2-character substring, for queries too short for trigrams
+    return list({word[i:i + n] for n in (1, 2) for i in range(len(word) - n + 1)})
+
+
+class SearchIndex:
+    # trigram index over a few text columns of a dataframe, results are row positions
+
+    def __init__(self, df, columns):
+        self.size = len(df)
+        text = normalize_series(df[columns[0]])
+        for col in columns[1:]:
+            text = text + " " + normalize_series(df[col])
+        self.texts = text.tolist()
+
+        # one row per (record, word); n-grams are computed once per distinct word
+        words = pd.Series(self.texts).str.split().explode().dropna()
+        word_codes, unique_words = pd.factorize(words)
+        record_rows = words.index.to_numpy(dtype=np.int64)
+
+        self.postings = self._postings(word_codes, record_rows, [
+            [gram for token in _tokens(word) for gram in _trigrams(token)] for word in unique_words])
+        # the trigram postings already hold every 3-character substring of a word (unpadded
+        # grams), these add the 1- and 2-character ones so short queries find infix matches,
+        # plus "x y" for every pair of adjacent words (the only short query with a space)
+        self.short_postings = self._postings(word_codes, record_rows, [
+            _short_grams(word) for word in unique_words])
+        adjacent = record_rows[1:] == record_rows[:-1]
+        boundaries = (words.str[-1].to_numpy()[:-1][adjacent] + " "
+                      + words.str[0].to_numpy()[1:][adjacent])
+        boundary_codes, boundary_grams = pd.factorize(pd.Series(boundaries, dtype=object))
+        self.short_postings.update(self._index(
+            boundary_grams, boundary_codes.astype(np.int64), record_rows[1:][adjacent]))
+
+    def _postings(self, word_codes, record_rows, word_grams):
+        # gram -> sorted record rows containing it, word_grams lists the grams of each distinct word
+        gram_ids = {}
+        word_grams = [[gram_ids.setdefault(gram, len(gram_ids)) for gram in grams]
+                      for grams in word_grams]
+        word_ptr = np.zeros(len(word_grams) + 1, dtype=np.int64)
+        word_ptr[1:] = np.cumsum([len(grams) for grams in word_grams])
+        flat_grams = np.fromiter((gram for grams in word_grams for gram in grams),
+                                 dtype=np.int64, count=word_ptr[-1])
+
+        # expand every (record, word) into its (record, gram) pairs, then dedupe and sort by gram
+        lengths = word_ptr[word_codes + 1] - word_ptr[word_codes]
+        offsets = np.repeat(word_ptr[word_codes] - np.cumsum(lengths) + lengths, lengths)
+        pair_grams = flat_grams[offsets + np.arange(lengths.sum())]
+        return self._index(list(gram_ids), pair_grams, np.repeat(record_rows, lengths))
+
+    def _index(self, grams, pair_grams, pair_rows):
+        # gram -> sorted unique rows, from (gram position in grams, row) pairs
+        pairs = np.sort(pair_grams * max(self.size, 1) + pair_rows)
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]][:len(pairs)]]
+        rows = (pairs % max(self.size, 1)).astype(np.int32)
+        bounds = np.searchsorted(pairs // max(self.size, 1),
+                                 np.arange(len(grams) + 1))
+        return {gram: rows[bounds[i]:bounds[i + 1]]
+                for i, gram in enumerate(grams)}
+
+    def _substring_rows(self, query):
+        # sorted rows whose text contains a query of at most 3 characters: the records holding
+        # it as one n-gram (or "x y" word boundary) are exactly the substring matches
+        postings = self.postings if len(query) == 3 and " " not in query else self.short_postings
+        return postings.get(query, np.array([], dtype=np.int32))
+
+    def search(self, query, limit=50):
+        query = normalize_text(query)
+        grams = set()
+        for token in query.split():
+            grams.update(_trigrams(token, pad_end=False))
+        if not grams or self.size == 0:
+            return []
+
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        counts = (np.bincount(np.concatenate(hits), minlength=self.size)
+                  if hits else np.zeros(self.size, dtype=np.int64))
+        scores = counts / len(grams)
+
+        if len(query) <= 3:
+            # too short for trigrams to find it inside a word ("son" in "johansson"); every
+            # candidate is a substring match, so only the best `limit` by score then row are kept
+            candidates = self._substring_rows(query)
+            if len(candidates) > limit:
+                order = -counts[candidates] * self.size + candidates
+                candidates = candidates[np.argpartition(order, limit)[:limit]]
+        else:
+            # longer queries get typo tolerance
+            candidates = np.flatnonzero(scores >= MIN_SIMILARITY)
+            if len(candidates) > limit * 4:
+                best = np.argpartition(-scores[candidates], limit * 4)[:limit * 4]
+                candidates = candidates[best]
+
+        # exact substring matches (the old behaviour) always rank first
+        ranked = sorted(candidates, key=lambda row: (
+            query not in self.texts[row], -scores[row], row))
+        return [int(row) for row in ranked[:limit]]
@@ -0,0 +1,362 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from itertools import groupby
+from typing import NamedTuple
+from coordinator import get_coordinator
+from metrics import pipeline_run, span
+from utils import (_write_atomic, aggregate_raw_scores, aggregation_score_rows, find_issues,
+                   load_judge_assignments, read_score_rows, report_issues, write_aggregation)
+
+logger = logging.getLogger()
+
+# hashes of the last downloaded raw_scores sheet, so unchanged downloads skip all file work
+RAW_SCORES_MANIFEST = "raw_scores_manifest.json"
+
+# rows last uploaded to the aggregated_scores worksheet, the baseline for delta uploads
+UPLOAD_MANIFEST = "aggregated_scores_uploaded.json"
+
+# id columns are stripped + uppercased before raw_scores.csv is written
+ID_COLUMNS = ["Student Project ID", "Judge ID"]
+
+
+class SheetDiff(NamedTuple):
+    # positions are 0-based data rows (header excluded); form responses only ever append,
+    # so rows are compared by position
+    appended: list
+    modified: list
+    deleted: list
+
+    @property
+    def append_only(self):
+        return not self.modified and not self.deleted
+
+
+def _row_hash(row):
+    return hashlib.blake2b("\x1f".join(row).encode(), digest_size=8).hexdigest()
+
+
+def hash_rows(values):
+    # returns (whole sheet hash, per data row hashes); the header is part of the sheet hash
+    row_hashes = [_row_hash(row) for row in values[1:]]
+    sheet = hashlib.sha256(_row_hash(values[0]).encode() if values else b"")
+    for row_hash in row_hashes:
+        sheet.update(row_hash.encode())
+    return sheet.hexdigest(), row_hashes
+
+
+def diff_rows(old_row_hashes, new_row_hashes):
+    common = min(len(old_row_hashes), len(new_row_hashes))
+    return SheetDiff(
+        appended=list(range(len(old_row_hashes), len(new_row_hashes))),
+        modified=[i for i in range(common)
+                  if old_row_hashes[i] != new_row_hashes[i]],
+        deleted=list(range(len(new_row_hashes), len(old_row_hashes))),
+    )
+
+
+def normalize_values(values):
+    if not values:
+        return values
+    header = values[0]
+    id_idx = [header.index(col) for col in ID_COLUMNS if col in header]
+    rows = [header]
+    for row in values[1:]:
+        row = list(row)
+        for i in id_idx:
+            if i < len(row):
+                row[i] = row[i].strip().upper()
+        rows.append(row)
+    return rows
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _load_manifest(data_dir):
+    if not os.path.exists(f"{data_dir}/raw_scores.csv"):
+        return None
+    return _load_json(f"{data_dir}/{RAW_SCORES_MANIFEST}")
+
+
+def diff_raw_scores(data_dir, values):
+    # values is worksheet.get_all_values(); returns (None, None, None) when nothing changed,
+    # otherwise (SheetDiff, raw_scores.csv bytes with ids normalized, new manifest), writes nothing
+    with span("detect changes", rows=max(len(values) - 1, 0)):
+        sheet_hash, row_hashes = hash_rows(values)
+        manifest = _load_manifest(data_dir)
+    if manifest is not None and manifest['sheet_sha256'] == sheet_hash:
+        return None, None, None
+
+    if manifest is None or manifest['header'] != (values[0] if values else []):
+        # nothing (comparable) to diff against, every row counts as new
+        diff = SheetDiff(list(range(len(row_hashes))), [], [])
+    else:
+        diff = diff_rows(manifest['row_hashes'], row_hashes)
+    logger.info(
+        f"raw_scores changed: {len(diff.appended)} appended, {len(diff.modified)} modified, {len(diff.deleted)} deleted")
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(normalize_values(values))
+    return diff, buffer.getvalue().encode(), {
+        'sheet_sha256': sheet_hash,
+        'header': values[0] if values else [],
+        'row_hashes': row_hashes,
+    }
+
+
+def write_raw_scores(data_dir, raw, manifest):
+    with span("write raw scores", rows=len(manifest['row_hashes'])):
+        _write_atomic(f"{data_dir}/raw_scores.csv", lambda f: f.write(raw), mode="wb")
+        _write_atomic(f"{data_dir}/{RAW_SCORES_MANIFEST}",
+                      lambda f: json.dump(manifest, f))
+
+
+def _changed_ranges(previous, rows):
+    # contiguous runs of changed rows, each narrowed to the columns that changed in it
+    width = max((len(row) for row in previous + rows), default=0)
+
+    def padded(values, i):
+        row = values[i] if i < len(values) else []
+        return list(row) + [""] * (width - len(row))
+
+    changed = {}
+    for i in range(max(len(previous), len(rows))):
+        cols = [j for j, (old, new) in enumerate(zip(padded(previous, i), padded(rows, i)))
+                if old != new]
+        if cols:
+            changed[i] = (cols[0], cols[-1])
+
+    from gspread.utils import rowcol_to_a1
+    data = []
+    # consecutive row numbers share the same (row - position) key
+    for _, run in groupby(enumerate(changed), key=lambda x: x[1] - x[0]):
+        run_rows = [i for _, i in run]
+        first = min(changed[i][0] for i in run_rows)
+        last = max(changed[i][1] for i in run_rows)
+        data.append({
+            'range': f"{rowcol_to_a1(run_rows[0] + 1, first + 1)}:{rowcol_to_a1(run_rows[-1] + 1, last + 1)}",
+            'values': [padded(rows, i)[first:last + 1] for i in run_rows],
+        })
+    return data
+
+
+def upload_rows(spreadsheet, rows, data_dir, title="aggregated_scores"):
+    # sync rows into the worksheet in place, sending only changed ranges in one batch;
+    # returns the number of ranges written
+    with span("upload", rows=len(rows)) as record:
+        record['ranges'] = _upload_rows(spreadsheet, rows, data_dir, title)
+    return record['ranges']
+
+
+def _upload_rows(spreadsheet, rows, data_dir, title):
+    manifest_path = f"{data_dir}/{UPLOAD_MANIFEST}"
+    manifest = _load_json(manifest_path)
+    width = max((len(row) for row in rows), default=1)
+
+    # gspread (and google-auth, requests) only load once something is actually uploaded
+    from gspread.exceptions import WorksheetNotFound
+    try:
+        worksheet = spreadsheet.worksheet(title)
+    except WorksheetNotFound:
+        worksheet = spreadsheet.add_worksheet(
+            title=title, rows=max(len(rows), 1), cols=width)
+        previous = []
+    else:
+        if manifest is not None and manifest['worksheet_id'] == worksheet.id:
+            # trusting our own record of what was last uploaded saves reading the worksheet back,
+            # which is only safe while this server is the only one uploading to it (hand edits
+            # or a second server's uploads in between are not noticed and stay in place)
+            previous = manifest['rows']
+        else:
+            # first sync to this worksheet (or another admin recreated it), diff against its content
+            previous = worksheet.get_all_values()
+
+    if len(rows) > worksheet.row_count or width > worksheet.col_count:
+        worksheet.resize(rows=max(len(rows), worksheet.row_count),
+                         cols=max(width, worksheet.col_count))
+
+    data = _changed_ranges(previous, rows)
+    if data:
+        worksheet.batch_update(data, value_input_option="RAW")
+    logger.info(f"Uploaded {len(data)} changed range(s) to {title}")
+
+    _write_atomic(manifest_path, lambda f: json.dump(
+        {'worksheet_id': worksheet.id, 'rows': rows}, f))
+    return len(data)
+
+
+def upload_output(spreadsheet, data_dir, text=None):
+    # text: output.csv content if the caller has it, saves reading it back; returns (rows uploaded, changed ranges)
+    if text is None:
+        with open(f"{data_dir}/output.csv", "r", newline="") as f:
+            text = f.read()
+    all_rows = list(csv.reader(io.StringIO(text)))
+    if not all_rows:
+        return 0, 0
+    return len(all_rows), upload_rows(spreadsheet, all_rows, data_dir)
+
+
+class PipelineResult(NamedTuple):
+    # diff is None when the sheet hadn't changed; processed is False when the run stopped there
+    diff: SheetDiff
+    processed: bool
+    projects: int
+    passed: bool
+    uploaded_rows: int
+    changed_ranges: int
+
+
+def process_values(data_dir, values, spreadsheet=None, force=False, incremental=True, verify=True, upload=False):
+    # downloaded rows -> normalize -> aggregate -> validate entirely in memory, then one atomic
+    # write per artifact and (optionally) the upload, without reading back what was just written
+    diff, raw, manifest = diff_raw_scores(data_dir, values)
+    if diff is None and not force and os.path.exists(f"{data_dir}/output.csv"):
+        return PipelineResult(None, False, 0, True, 0, 0)
+
+    assignments = load_judge_assignments(data_dir)
+    # edited/removed rows always need a full rebuild; raw is None when the sheet is unchanged
+    # (forced run), then raw_scores.csv on disk is current
+    aggregation = aggregate_raw_scores(data_dir, assignments, raw=raw,
+                                       incremental=incremental and (diff is None or diff.append_only))
+    issues = None
+    if verify:
+        with span("validate") as record:
+            score_rows = aggregation_score_rows(aggregation)
+            if score_rows is None:
+                score_rows = read_score_rows(data_dir)
+            issues = find_issues(aggregation.final_df, assignments, score_rows)
+            record['rows'] = len(issues)
+
+    if raw is not None:
+        write_raw_scores(data_dir, raw, manifest)
+    text = write_aggregation(data_dir, aggregation)
+    passed = report_issues(data_dir, issues) if verify else True
+
+    uploaded_rows = changed_ranges = 0
+    if passed and upload and spreadsheet is not None:
+        uploaded_rows, changed_ranges = upload_output(spreadsheet, data_dir, text)
+    return PipelineResult(diff, True, len(aggregation.final_df), passed, uploaded_rows, changed_ranges)
+
+
+def sync_spreadsheet(data_dir, open_spreadsheet, trigger, **options):
+    # connect -> fetch -> process_values as one recorded run; open_spreadsheet() returns the
+    # (authorized) gspread spreadsheet, options are passed on to process_values
+    with pipeline_run(data_dir, trigger) as run:
+        with span("connect"):
+            spreadsheet = open_spreadsheet()
+        with span("fetch") as record:
+            values = spreadsheet.worksheet("raw_scores").get_all_values()
+            record['rows'] = max(len(values) - 1, 0)
+        result = process_values(data_dir, values, spreadsheet, **options)
+        run['processed'] = result.processed
+    return result
+
+
+def coordinated_sync(data_dir, open_spreadsheet, trigger, **options):
+    # sync_spreadsheet through the data directory's coordinator, so concurrent sessions and the
+    # background worker never process at the same time; returns (result, joined another run)
+    return get_coordinator(data_dir).run(
+        lambda: sync_spreadsheet(data_dir, open_spreadsheet, trigger, **options))
+
+
+class SheetSyncWorker:
+    # polls the raw_scores worksheet on a background thread and processes new data;
+    # client_factory is called once (e.g. gspread.service_account) and the client is reused
+
+    def __init__(self, client_factory, spreadsheet_key, data_dir, interval=60, max_backoff=600):
+        self.client_factory = client_factory
+        self.spreadsheet_key = spreadsheet_key
+        self.data_dir = data_dir
+        self.interval = interval
+        self.max_backoff = max_backoff
+        # keyword arguments for process_values, see configure()
+        self.options = {}
+
+        self.last_checked = None
+        self.last_changed = None
+        self.last_diff = None
+        self.last_result = None
+        self.last_error = None
+        self.failures = 0
+
+        self._client = None
+        self._spreadsheet = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def configure(self, interval=None, **options):
+        if interval is not None and interval != self.interval:
+            self.interval = interval
+            self._wake.set()
+        self.options.update(options)
+
+    def spreadsheet(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        if self._spreadsheet is None:
+            self._spreadsheet = self._client.open_by_key(self.spreadsheet_key)
+        return self._spreadsheet
+
+    def sync_once(self):
+        result, _ = coordinated_sync(self.data_dir, self.spreadsheet, "background", **self.options)
+        if result.processed:
+            self.last_result = result
+            self.last_diff = result.diff
+            self.last_changed = time.time()
+        self.last_checked = time.time()
+
+    def _delay(self):
+        # exponential backoff after failures, capped at max_backoff
+        if self.failures == 0:
+            return self.interval
+        return min(self.interval * 2 ** self.failures, self.max_backoff)
+
+    def _run(self, stop):
+        # stop is this thread's own event, so a fresh thread can start while an old one finishes its sync
+        while not stop.is_set():
+            try:
+                self.sync_once()
+                self.failures = 0
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                # reopen the spreadsheet next time, the client itself stays authorized
+                self._spreadsheet = None
+                logger.error(f"Background sync failed ({self.failures}x): {e}")
+            self._wake.wait(self._delay())
+            self._wake.clear()
+
+    @property
+    def running(self):
+        # server-wide state, shared by every session
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        # never waits for a stopping thread (it may be in the middle of a network sync);
+        # overlapping syncs are serialized by the coordinator
+        if not self.running:
+            self._stop = threading.Event()
+            self._wake.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stop,), name="sheet-sync", daemon=True)
+            self._thread.start()
+
+    def request_sync(self):
+        # run the next poll now instead of waiting for the interval
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
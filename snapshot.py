@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    # snapshots are only a cache, without pyarrow everything is read from csv
+    pa = None
+
+logger = logging.getLogger()
+
+# typed, normalized copies of the csv inputs/outputs, memory-mapped on load
+SNAPSHOT_DIR = "snapshot"
+
+
+def _source_key(path):
+    stat = os.stat(path)
+    return json.dumps([stat.st_mtime_ns, stat.st_size])
+
+
+def _snapshot_path(data_dir, source):
+    return f"{data_dir}/{SNAPSHOT_DIR}/{os.path.splitext(source)[0]}.feather"
+
+
+def write_snapshot(data_dir, source, df, source_key=None):
+    # source is the csv in data_dir the frame was built from (or written to); source_key is
+    # its _source_key() from before it was parsed, otherwise the csv is stat'ed now
+    if pa is None:
+        return
+    if source_key is None:
+        source_key = _source_key(f"{data_dir}/{source}")
+    path = _snapshot_path(data_dir, source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"source_key": source_key.encode(),
+    })
+    feather.write_feather(table, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+def read_snapshot(data_dir, source):
+    # None if there's no snapshot or the csv changed since it was taken
+    path = _snapshot_path(data_dir, source)
+    if pa is None or not os.path.exists(path) or not os.path.exists(f"{data_dir}/{source}"):
+        return None
+    table = feather.read_table(path, memory_map=True)
+    if (table.schema.metadata or {}).get(b"source_key", b"").decode() != _source_key(f"{data_dir}/{source}"):
+        return None
+    return table.to_pandas()
+
+
+def load_table(data_dir, source, build):
+    # build(path) parses + normalizes the csv, it only runs when the snapshot is missing or stale
+    df = read_snapshot(data_dir, source)
+    if df is None:
+        # stat before parsing, a csv replaced mid-parse then leaves a stale key, not a stale frame
+        source_key = _source_key(f"{data_dir}/{source}")
+        df = build(f"{data_dir}/{source}")
+        if pa is not None:
+            try:
+                write_snapshot(data_dir, source, df, source_key)
+            except (OSError, pa.ArrowException) as e:
+                logger.warning(f"Could not snapshot {source}: {e}")
+    return df
@@ -1,10 +1,14 @@
 import streamlit as st
-import gspread
-import csv
 import os
-import pandas as pd
 from dotenv import load_dotenv
-from utils import verify_validity, generate_csv
+from coordinator import get_coordinator
+from metrics import pipeline_run, read_runs
+from sheet_sync import coordinated_sync, SheetSyncWorker
+from store import open_store
+import time
+from statistics import median
+from placements import compute_placements, criterion_means
+from utils import verify_validity, generate_csv, load_judge_assignments, load_fair_state, read_student_assignments, FAIR_STATE_FILES, SCORING_COLUMNS
 import logging
 
 load_dotenv()
@@ -30,21 +34,140 @@ tab1, tab2, tab3 = st.tabs(
     ["Search Students", "Search Judges", "Process Scores"])
 
 
+def _file_version(path):
+    # (mtime, size) changes whenever processing rewrites the file
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _cached_fair_state(data_dir, versions):
+    # shared across reruns and sessions, versions is only part of the cache key
+    return load_fair_state(data_dir)
+
+
+def get_fair_state():
+    versions = tuple(_file_version(f"{data_dir}/{fname}")
+                     for fname in FAIR_STATE_FILES)
+    return _cached_fair_state(data_dir, versions)
+
+
+@st.cache_resource(show_spinner=False)
+def get_sheets_client():
+    # authorize once per server process, not on every click; gspread and the google auth stack
+    # are imported here so sessions that only view results never load them
+    import gspread
+    return gspread.service_account()
+
+
+@st.cache_resource(show_spinner=False)
+def get_sync_worker():
+    # one background worker per server process, shared by all sessions
+    return SheetSyncWorker(get_sheets_client, os.getenv("SPREADSHEET_KEY"), data_dir)
+
+
+# categories rendered per page of the results view
+CATEGORIES_PER_PAGE = 10
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _download_payload(data_dir, version):
+    # output.csv already is the export, only re-read when its version changes
+    with open(f"{data_dir}/output.csv", "rb") as f:
+        return f.read()
+
+
+@st.fragment
+def issues_panel(issues_df):
+    errors = int((issues_df["Severity"] == "error").sum())
+    with st.expander(f"Validity issues ({len(issues_df)} found, {errors} error(s))", expanded=errors > 0):
+        severities = st.multiselect(
+            "Severity", ["error", "warning", "info"], default=["error", "warning"])
+        checks = st.multiselect("Check", sorted(issues_df["Check"].unique()))
+        shown = issues_df[issues_df["Severity"].isin(severities)]
+        if checks:
+            shown = shown[shown["Check"].isin(checks)]
+        st.dataframe(shown, use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def results_view(output_df):
+    # filtering and paging only rerun this fragment, and only one page of categories is rendered;
+    # with the sqlite store the page is an indexed query instead of a filter over all results
+    store = open_store(data_dir)
+    categories = store.categories() if store else sorted(output_df["Category"].dropna().unique())
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        category_filter = st.text_input(
+            "Filter categories", placeholder="e.g., 'MCS' or 'Chemistry'")
+    if category_filter:
+        categories = [category for category in categories
+                      if category_filter.casefold() in category.casefold()]
+    pages = max((len(categories) - 1) // CATEGORIES_PER_PAGE + 1, 1)
+    with col2:
+        page = st.number_input(
+            f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+
+    shown = categories[(page - 1) * CATEGORIES_PER_PAGE:page * CATEGORIES_PER_PAGE]
+    st.caption(f"{len(categories)} categor{'y' if len(categories) == 1 else 'ies'}, "
+               f"showing {len(shown)}")
+    page_df = store.category_results(shown) if store else output_df[output_df["Category"].isin(shown)]
+    for category, category_df in page_df.groupby("Category", sort=True):
+        st.subheader(f"**{category}**")
+        st.dataframe(category_df, use_container_width=True,
+                     hide_index=True)
+
+
+@st.fragment
+def placements_panel(fair_state):
+    # recomputed from the current results on every change, cheap enough to follow late scores live
+    with st.expander("Placements"):
+        col1, col2 = st.columns(2)
+        with col1:
+            top_n = st.number_input("Places per category", min_value=1, value=3)
+        with col2:
+            min_judges = st.number_input("Minimum judges", min_value=0, value=1)
+        tie_breakers = st.multiselect(
+            "Break ties on (in order)", SCORING_COLUMNS,
+            disabled=fair_state.score_tensor is None)
+        placements = compute_placements(
+            fair_state.output_df, read_student_assignments(data_dir), top_n, min_judges, tie_breakers,
+            criterion_means(fair_state.score_tensor) if tie_breakers else None)
+        st.dataframe(placements, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="Download placements",
+            data=placements.to_csv(index=False),
+            file_name="placements.csv",
+            mime="text/csv",
+        )
+
+
+def process_local():
+    with pipeline_run(data_dir, "local"):
+        assignments = load_judge_assignments(data_dir)
+        final_scores = generate_csv(data_dir, assignments)
+        verify_validity(final_scores, data_dir, assignments)
+
+
 def generate_tab():
     st.markdown("---")
 
-    output_df = pd.read_csv(f"{data_dir}/output.csv")
+    fair_state = get_fair_state()
+    output_df = fair_state.output_df
 
-    categories = output_df["Category"].unique()
-    for category in sorted(categories):
-        st.subheader(f"**{category}**")
-        category_df = output_df[output_df["Category"] == category]
-        st.dataframe(category_df, use_container_width=True,
-                     hide_index=True)
+    if fair_state.issues_df is not None and len(fair_state.issues_df) > 0:
+        issues_panel(fair_state.issues_df)
+
+    placements_panel(fair_state)
+
+    results_view(output_df)
 
     st.download_button(
         label="Download CSV",
-        data=output_df.to_csv(index=False),
+        data=_download_payload(data_dir, _file_version(f"{data_dir}/output.csv")),
         file_name="aggregated_scores.csv",
         mime="text/csv",
     )
@@ -55,8 +178,9 @@ with tab1:
     st.markdown(
         "Search for a student to view their project details and assigned judges")
 
-    if os.path.exists(f"{data_dir}/output.csv"):
-        output_df = pd.read_csv(f"{data_dir}/output.csv")
+    fair_state = get_fair_state()
+    if fair_state.output_df is not None:
+        output_df = fair_state.output_df
 
         search_term = st.text_input(
             "Search by Student Name or Project ID",
@@ -64,16 +188,19 @@ with tab1:
         )
 
         if search_term:
-            mask = (
-                output_df["Student Name"].astype(
-                    str).str.contains(search_term, case=False, na=False)
-                | output_df["Student Project ID"].astype(str).str.contains(search_term, case=False, na=False)
-            )
-            results = output_df[mask]
+            # ranked, typo tolerant, index is rebuilt only when output.csv changes
+            results = output_df.iloc[fair_state.student_search.search(
+                search_term)]
+            store = open_store(data_dir)
+            if store:
+                # the hits' rows as indexed point lookups
+                rows = [row for row in map(store.project, results['Student Project ID']) if row is not None]
+            else:
+                rows = results.to_dict('records')
 
-            if len(results) > 0:
-                st.success(f"Found {len(results)} result(s)")
-                for idx, row in results.iterrows():
+            if len(rows) > 0:
+                st.success(f"Found {len(rows)} result(s)")
+                for row in rows:
                     with st.expander(
                         f"**{row['Student Name']}** - {row['Student Project ID']}"
                     ):
@@ -104,56 +231,31 @@ with tab2:
     st.markdown(
         "Search for a judge to view projects they've judged and haven't judged yet")
 
-    if (
-        os.path.exists(f"{data_dir}/ids_judges.csv")
-        and os.path.exists(f"{data_dir}/output.csv")
-    ):
-        ids_judges_df = pd.read_csv(f"{data_dir}/ids_judges.csv")
-        output_df = pd.read_csv(f"{data_dir}/output.csv")
-
-        # Map judge_id -> list of projects they judged
-        judge_to_judged = {}
-        # Map judge_id -> list of projects assigned to them
-        judge_to_assigned = {}
-
-        for _, project_row in output_df.iterrows():
-            # judges who judged the project
-            judges_had = [j.strip().upper()
-                          for j in str(project_row['Judges Had']).split(',') if j.strip()]
-            for judge_id in judges_had:
-                if judge_id not in judge_to_judged:
-                    judge_to_judged[judge_id] = []
-                judge_to_judged[judge_id].append({
-                    'id': project_row['Student Project ID'],
-                    'student': project_row['Student Name'],
-                    'category': project_row['Category'],
-                    'score': project_row['Average Total Score']
-                })
-
-            # judges assigned to the project
-            assigned_judges = [j.strip().upper() for j in str(
-                project_row['Assigned Judges']).split(',') if j.strip()]
-            for judge_id in assigned_judges:
-                if judge_id not in judge_to_assigned:
-                    judge_to_assigned[judge_id] = []
-                judge_to_assigned[judge_id].append({
-                    'id': project_row['Student Project ID'],
-                    'student': project_row['Student Name'],
-                    'category': project_row['Category']
-                })
+    fair_state = get_fair_state()
+    if fair_state.ids_judges_df is not None and fair_state.output_df is not None:
+        ids_judges_df = fair_state.ids_judges_df
+
+        # judge_id -> judged / assigned / pending projects, built during processing
+        judge_index = fair_state.judge_index
+        store = open_store(data_dir)
+
+        if fair_state.score_tensor is not None:
+            with st.expander("Judge scoring statistics"):
+                # bias: how far a judge's totals sit from the average total of the projects they scored
+                stats = fair_state.score_tensor.judge_stats()
+                names = ids_judges_df.set_index(
+                    ids_judges_df["JUDGE ID"].str.strip().str.upper())
+                names = names[~names.index.duplicated()]
+                stats.insert(0, "Name", names["FIRST"] + " " + names["LAST"])
+                st.dataframe(stats[stats["Entries"] > 0].sort_values("Bias"),
+                             use_container_width=True)
 
         search_judge = st.text_input(
             "Search by Judge Name or Judge ID", placeholder="e.g., 'Smith' or 'MOH'")
 
         if search_judge:
-            mask = (
-                ids_judges_df["FIRST"].astype(str).str.contains(
-                    search_judge, case=False, na=False)
-                | ids_judges_df["LAST"].astype(str).str.contains(search_judge,
-                                                                 case=False, na=False)
-                | ids_judges_df["JUDGE ID"].astype(str).str.contains(search_judge, case=False, na=False)
-            )
-            results = ids_judges_df[mask]
+            results = ids_judges_df.iloc[fair_state.judge_search.search(
+                search_judge)]
 
             if len(results) > 0:
                 st.success(f"Found {len(results)} judge(s)")
@@ -162,8 +264,8 @@ with tab2:
                     judge_name = f"{row['FIRST']} {row['LAST']}"
 
                     with st.expander(f"**{judge_name}** ({judge_id})"):
-                        judged_projects = judge_to_judged.get(judge_id, [])
-                        assigned_projects = judge_to_assigned.get(judge_id, [])
+                        judge_entry = store.judge_projects(judge_id) if store else judge_index.get(judge_id, {})
+                        judged_projects = judge_entry.get('judged', [])
 
                         col1, col2 = st.columns(2)
 
@@ -179,9 +281,7 @@ with tab2:
 
                         with col2:
                             st.markdown(f"### Not Yet Judged")
-                            judged_ids = [p['id'] for p in judged_projects]
-                            unjudged = [
-                                p for p in assigned_projects if p['id'] not in judged_ids]
+                            unjudged = judge_entry.get('pending', [])
                             if unjudged:
                                 st.warning(
                                     f"{len(unjudged)} project(s) pending")
@@ -207,99 +307,136 @@ verify_validity_flag = st.sidebar.checkbox(
 )
 check_updates = st.sidebar.checkbox(
     "Check for updates", value=True, help="Only process if spreadsheet has changed")
+incremental_processing = st.sidebar.checkbox(
+    "Incremental processing", value=True, help="Only aggregate score rows added since the last run (falls back to a full rebuild if rows were edited or deleted)")
 upload_to_sheets = st.sidebar.checkbox(
     "Upload to Google Sheets", value=False, help="Upload processed results to Google Sheets")
+# the worker is shared by the whole server process, so it is only started / stopped on purpose
+# and its settings are the ones chosen by the admin who started it
+sync_worker = get_sync_worker()
+st.sidebar.subheader("Background sync")
+if sync_worker.running:
+    options = sync_worker.options
+    st.sidebar.caption(
+        f"Running for all sessions every {sync_worker.interval}s "
+        f"(verify: {'on' if options.get('verify') else 'off'}, upload: {'on' if options.get('upload') else 'off'})")
+    if st.sidebar.button("Stop background sync"):
+        sync_worker.stop()
+        st.rerun()
+else:
+    sync_interval = st.sidebar.number_input(
+        "Sync interval (seconds)", min_value=10, value=sync_worker.interval, step=10)
+    if st.sidebar.button("Start background sync", help="Poll the spreadsheet in the background and process new scores automatically, with the options above"):
+        sync_worker.configure(interval=sync_interval, incremental=incremental_processing,
+                              verify=verify_validity_flag, upload=upload_to_sheets)
+        sync_worker.start()
+        st.rerun()
+background_sync = sync_worker.running
+
+
+def _ago(timestamp):
+    return "never" if timestamp is None else f"{int(time.time() - timestamp)}s ago"
+
+
+@st.fragment(run_every=5)
+def sync_status():
+    # only this panel reruns on the timer; the whole app reruns when new results land
+    st.caption(
+        f"Last checked: {_ago(sync_worker.last_checked)} · last update: {_ago(sync_worker.last_changed)}")
+    if sync_worker.last_result is not None and not sync_worker.last_result.passed:
+        st.error("Latest results failed validity checks")
+    if sync_worker.last_error:
+        st.warning(
+            f"Sync failing ({sync_worker.failures}x), retrying: {sync_worker.last_error}")
+    if st.session_state.get("seen_sync") != sync_worker.last_changed:
+        st.session_state["seen_sync"] = sync_worker.last_changed
+        st.rerun(scope="app")
+
+
+if background_sync:
+    with st.sidebar:
+        sync_status()
+
+
+def timings_panel():
+    # last processing run per stage, compared against the median of recent runs
+    runs = [run for run in read_runs(data_dir) if run['processed']]
+    with st.sidebar.expander("Pipeline timings"):
+        if not runs:
+            st.caption("No processing runs recorded yet")
+            return
+        last = runs[0]
+        status = "" if last['status'] == "ok" else f" · failed ({last['status']})"
+        st.caption(
+            f"Last run: {last['trigger']}, {_ago(last['time'])}, {last['seconds']:.2f}s{status}")
+        history = {}
+        for run in runs[1:]:
+            for record in run['spans']:
+                history.setdefault(record['stage'], []).append(record['seconds'])
+        st.dataframe([{
+            'stage': record['stage'],
+            'seconds': record['seconds'],
+            'rows': record['rows'],
+            'vs median': f"{record['seconds'] / median(history[record['stage']]):.1f}x"
+            if median(history.get(record['stage'], [0])) > 0 else "",
+        } for record in last['spans']], hide_index=True, use_container_width=True)
+        st.caption("Recent runs")
+        st.dataframe([{
+            'when': _ago(run['time']),
+            'trigger': run['trigger'],
+            'seconds': run['seconds'],
+            'status': run['status'],
+        } for run in runs], hide_index=True, use_container_width=True)
+
+
+timings_panel()
 
 with tab3:
-    if st.button("Process Scores", type="primary"):
-        with st.spinner("Fetching data from Google Sheets..."):
+    if background_sync:
+        if st.button("Sync now", type="primary"):
+            sync_worker.request_sync()
+            st.info("Sync requested, results will appear when it finishes")
+        if os.path.exists(f"{data_dir}/output.csv"):
+            generate_tab()
+        else:
+            st.info("Waiting for the first background sync")
+    elif st.button("Process Scores", type="primary"):
+        with st.spinner("Fetching and processing scores from Google Sheets..."):
             try:
-                gc = gspread.service_account()
-                spreadsheet = gc.open_by_key(os.getenv("SPREADSHEET_KEY"))
-                worksheet = spreadsheet.worksheet("raw_scores")
-
-                # download raw scores from online sheets
-                temp_fname = f"{data_dir}/raw_scores_temp.csv"
-                old_fname = f"{data_dir}/raw_scores.csv"
-
-                with open(temp_fname, "w") as f:
-                    writer = csv.writer(f)
-                    writer.writerows(worksheet.get_all_values())
-
-                # only process the scores if there are updates, otherwise skip to display
-                should_process = True
-                if os.path.exists(old_fname) and check_updates:
-                    old_scores = pd.read_csv(old_fname)
-                    new_scores = pd.read_csv(temp_fname)
-                    if old_scores.equals(new_scores):
-                        st.info("Raw scores haven't changed since last run")
-                        should_process = False
-                    else:
-                        st.success("New scores detected")
-                        os.remove(old_fname)
-                        os.rename(temp_fname, old_fname)
+                # download -> normalize -> aggregate -> validate -> upload in memory, each file is written once;
+                # if another admin (or the background sync) is already processing, wait for that run instead
+                result, joined = coordinated_sync(
+                    data_dir, lambda: get_sheets_client().open_by_key(os.getenv("SPREADSHEET_KEY")), "button",
+                    force=not check_updates, incremental=incremental_processing,
+                    verify=verify_validity_flag, upload=upload_to_sheets)
+                if joined:
+                    st.info("Scores were already being processed in another session, showing that run's results")
+
+                # only processed if there are updates, otherwise skip to display
+                if result.diff is None:
+                    st.info("Raw scores haven't changed since last run")
                 else:
-                    if os.path.exists(temp_fname):
-                        if os.path.exists(old_fname):
-                            os.remove(old_fname)
-                        os.rename(temp_fname, old_fname)
-
-                # open raw_scores and strip + upper Student Project ID and Judge ID columns
-                raw_scores_df = pd.read_csv(f"{data_dir}/raw_scores.csv")
-                raw_scores_df["Student Project ID"] = raw_scores_df["Student Project ID"].str.strip(
-                ).str.upper()
-                raw_scores_df["Judge ID"] = raw_scores_df["Judge ID"].str.strip(
-                ).str.upper()
-                raw_scores_df.to_csv(f"{data_dir}/raw_scores.csv", index=False)
-
-                if should_process or not check_updates:
-                    with st.spinner("Processing scores..."):
-                        final_df = generate_csv(data_dir)
-                        st.success(f"Processed {len(final_df)} projects")
-
-                    if verify_validity_flag:
-                        with st.spinner("Verifying validity..."):
-                            if verify_validity(final_df, data_dir):
-                                st.success("✅ Passed all validity checks")
-                                valid = True
-                            else:
-                                st.error(
-                                    "❌ Validity checks failed - see science_fair_judging.log for details")
-                                valid = False
-                    else:
+                    st.success(
+                        f"New scores detected ({len(result.diff.appended)} new, {len(result.diff.modified)} edited, {len(result.diff.deleted)} removed)")
+                if result.processed:
+                    st.success(f"Processed {result.projects} projects")
+                    if not verify_validity_flag:
                         st.warning("Skipping validity verification")
-                        valid = True
-
+                    elif result.passed:
+                        st.success("✅ Passed all validity checks")
+                    else:
+                        st.error(
+                            "❌ Validity checks failed - see the validity issues below")
                     # upload to google sheets (so other admins can see it, a little scuffed but would otherwise require formal database handling)
-                    if valid and upload_to_sheets:
-                        with st.spinner("Uploading to Google Sheets..."):
-                            try:
-                                spreadsheet.del_worksheet(
-                                    spreadsheet.worksheet("aggregated_scores"))
-                            except gspread.exceptions.WorksheetNotFound:
-                                pass
-
-                            spreadsheet.add_worksheet(
-                                title="aggregated_scores", rows=500, cols=20)
-                            worksheet = spreadsheet.worksheet(
-                                "aggregated_scores")
-
-                            with open(f"{data_dir}/output.csv", "r") as f:
-                                all_rows = list(csv.reader(f))
-
-                            if all_rows:
-                                worksheet.update(
-                                    all_rows,
-                                    f"A1:Z{len(all_rows)}",
-                                    value_input_option="RAW",
-                                )
-                                st.success(
-                                    f"✅ Uploaded {len(all_rows)} rows to Google Sheets")
-
-                    elif valid and not upload_to_sheets:
+                    # worksheet stays in place, only changed cell ranges are sent
+                    if result.uploaded_rows:
+                        st.success(
+                            f"✅ Synced {result.uploaded_rows} rows to Google Sheets ({result.changed_ranges} changed range(s))")
+                    elif result.passed and not upload_to_sheets:
                         st.info(
                             "Skipped uploading to Google Sheets (disabled in options)")
 
+                if result.processed:
                     st.rerun()
 
                 if os.path.exists(f"{data_dir}/output.csv"):
@@ -315,8 +452,7 @@ with tab3:
                     st.error(f"❌ Error: {str(e)}")
                     logger.error(f"Streamlit error: {str(e)}")
                 # it may be the case that you are working with dummy data, so just generate output if possible
-                final_scores = generate_csv(data_dir)
-                validity_passed = verify_validity(final_scores, data_dir)
+                get_coordinator(data_dir).run(process_local)
                 generate_tab()
                 st.rerun()
 
@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from functools import lru_cache
+import pandas as pd
+from dotenv import load_dotenv
+
+# optional indexed copy of a fair in data_dir/fair.db, enabled with FAIR_STORE=sqlite.
+# the csv files stay the source of truth: every processing run refreshes the store in one
+# transaction, and in WAL mode readers keep seeing the previous version until it commits,
+# so lookups never block on (or see half of) a processing run
+
+STORE_FILE = "fair.db"
+# a second writer waits this long for the first one to commit
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS projects (
+    project_id TEXT PRIMARY KEY, category TEXT, student_first TEXT, student_last TEXT, title TEXT);
+CREATE INDEX IF NOT EXISTS projects_category ON projects (category);
+CREATE TABLE IF NOT EXISTS judges (judge_id TEXT PRIMARY KEY, first TEXT, last TEXT);
+CREATE TABLE IF NOT EXISTS assignments (
+    project_id TEXT NOT NULL, judge_id TEXT NOT NULL, PRIMARY KEY (project_id, judge_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assignments_judge ON assignments (judge_id, project_id);
+CREATE TABLE IF NOT EXISTS results (
+    position INTEGER PRIMARY KEY, category TEXT, project_id TEXT NOT NULL, student_name TEXT, title TEXT,
+    average_total REAL, judges_num INTEGER, judges_had TEXT, assigned_judges TEXT);
+CREATE INDEX IF NOT EXISTS results_project ON results (project_id);
+CREATE INDEX IF NOT EXISTS results_category ON results (category, position);
+"""
+
+# output.csv column -> results column
+RESULT_COLUMNS = {
+    'Category': 'category', 'Student Project ID': 'project_id', 'Student Name': 'student_name',
+    'Title of Presentation': 'title', 'Average Total Score': 'average_total', 'Judges Num': 'judges_num',
+    'Judges Had': 'judges_had', 'Assigned Judges': 'assigned_judges',
+}
+
+
+@lru_cache(maxsize=None)
+def _load_env():
+    # .env is read here rather than by each entry point, so the ui and the command line
+    # tools (process_fairs.py, placements.py, utils.py) agree on whether the store is kept
+    load_dotenv()
+
+
+def store_enabled():
+    _load_env()
+    return os.getenv("FAIR_STORE", "").strip().lower() == "sqlite"
+
+
+def output_key(data_dir):
+    # identifies the output.csv the store was last refreshed with
+    stat = os.stat(f"{data_dir}/output.csv")
+    return json.dumps([stat.st_mtime_ns, stat.st_size])
+
+
+def open_store(data_dir):
+    # the store to read from; None when it's disabled, nothing was processed into it yet, or
+    # output.csv (the source of truth) was rewritten since, e.g. by a run with the store disabled
+    store = FairStore(data_dir)
+    if not store_enabled() or not os.path.exists(store.path) or not os.path.exists(f"{data_dir}/output.csv"):
+        return None
+    return store if store.meta("output_key") == output_key(data_dir) else None
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _rows(df):
+    # NaN -> NULL, numpy scalars -> python
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class FairStore:
+
+    def __init__(self, data_dir):
+        self.path = f"{data_dir}/{STORE_FILE}"
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    @contextmanager
+    def _read(self):
+        with closing(self._connect()) as con:
+            yield con
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, readers carry on from the last commit
+        with closing(self._connect()) as con:
+            con.executescript(SCHEMA)
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                yield con
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
+
+    def meta(self, key):
+        # e.g. rows_sha256 (fingerprint of the raw score rows stored) or output_key, None if unset
+        if not os.path.exists(self.path):
+            return None
+        with self._read() as con:
+            try:
+                row = con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            except sqlite3.OperationalError:
+                return None
+        return row[0] if row else None
+
+    def rows_sha256(self):
+        return self.meta("rows_sha256")
+
+    def write(self, final_df, projects, judges, assigned, score_chunks, criteria, append, rows_sha256, output_key):
+        # replaces everything but the scores, which are either appended (the chunks extend the
+        # rows already stored) or replaced; score_chunks are normalized score frames in file order
+        with self._transaction() as con:
+            for table in ["projects", "judges", "assignments", "results"]:
+                con.execute(f"DELETE FROM {table}")
+            con.executemany("INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?)", _rows(projects))
+            con.executemany("INSERT OR REPLACE INTO judges VALUES (?, ?, ?)", _rows(judges))
+            con.executemany("INSERT OR IGNORE INTO assignments VALUES (?, ?)", _rows(assigned))
+            results = final_df[list(RESULT_COLUMNS)].reset_index(drop=True)
+            con.executemany(f"INSERT INTO results (position, {', '.join(RESULT_COLUMNS.values())}) "
+                            f"VALUES (?, {', '.join('?' * len(RESULT_COLUMNS))})", _rows(results.reset_index()))
+
+            columns = ", ".join(f"{_quote(col)} REAL" for col in criteria)
+            stored = [row[1] for row in con.execute("PRAGMA table_info(scores)")][3:]
+            if not append or stored != list(criteria):
+                con.execute("DROP TABLE IF EXISTS scores")
+                start = 0
+            else:
+                start = con.execute("SELECT COALESCE(MAX(entry) + 1, 0) FROM scores").fetchone()[0]
+            con.execute(f"CREATE TABLE IF NOT EXISTS scores (entry INTEGER PRIMARY KEY, "
+                        f"project_id TEXT NOT NULL, judge_id TEXT NOT NULL, {columns})")
+            con.execute("CREATE INDEX IF NOT EXISTS scores_project ON scores (project_id, judge_id)")
+            con.execute("CREATE INDEX IF NOT EXISTS scores_judge ON scores (judge_id, project_id)")
+            insert = f"INSERT INTO scores VALUES (?, ?, ?, {', '.join('?' * len(criteria))})"
+            for chunk in score_chunks:
+                chunk = chunk[['Student Project ID', 'Judge ID', *criteria]].reset_index(drop=True)
+                chunk.index += start
+                con.executemany(insert, _rows(chunk.reset_index()))
+                start += len(chunk)
+
+            con.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                            [('rows_sha256', rows_sha256), ('output_key', output_key)])
+
+    def categories(self):
+        with self._read() as con:
+            return [row[0] for row in con.execute(
+                "SELECT DISTINCT category FROM results WHERE category IS NOT NULL ORDER BY category")]
+
+    def category_results(self, categories):
+        # output.csv rows of the given categories, in output order
+        columns = ", ".join(f"{column} AS {_quote(name)}" for name, column in RESULT_COLUMNS.items())
+        with self._read() as con:
+            return pd.read_sql_query(
+                f"SELECT {columns} FROM results WHERE category IN ({', '.join('?' * len(categories))}) "
+                "ORDER BY position", con, params=list(categories))
+
+    def project(self, project_id):
+        # one output.csv row as a dict, None if the project has no scores yet
+        columns = ", ".join(f"{column} AS {_quote(name)}" for name, column in RESULT_COLUMNS.items())
+        with self._read() as con:
+            con.row_factory = sqlite3.Row
+            row = con.execute(f"SELECT {columns} FROM results WHERE project_id = ?",
+                              (project_id,)).fetchone()
+        return dict(row) if row else None
+
+    def judge_projects(self, judge_id):
+        # same shape as a judge_index.json entry; pending also lists assigned projects without any scores
+        project = ("p.project_id AS id, p.student_first || ' ' || p.student_last AS student, "
+                   "p.category AS category, r.average_total AS score")
+        queries = {
+            'judged': f"""SELECT {project} FROM projects p LEFT JOIN results r ON r.project_id = p.project_id
+                WHERE p.project_id IN (SELECT project_id FROM scores WHERE judge_id = :judge)
+                ORDER BY r.position""",
+            'assigned': f"""SELECT {project} FROM assignments a JOIN projects p ON p.project_id = a.project_id
+                LEFT JOIN results r ON r.project_id = a.project_id
+                WHERE a.judge_id = :judge ORDER BY p.category, r.position, p.project_id""",
+            'pending': f"""SELECT {project} FROM assignments a JOIN projects p ON p.project_id = a.project_id
+                LEFT JOIN results r ON r.project_id = a.project_id
+                WHERE a.judge_id = :judge AND NOT EXISTS (
+                    SELECT 1 FROM scores s WHERE s.project_id = a.project_id AND s.judge_id = a.judge_id)
+                ORDER BY p.category, r.position, p.project_id""",
+        }
+        with self._read() as con:
+            con.row_factory = sqlite3.Row
+            return {key: [dict(row) for row in con.execute(query, {'judge': judge_id})]
+                    for key, query in queries.items()}
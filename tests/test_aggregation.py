@@ -0,0 +1,97 @@
+import shutil
+
+import pytest
+
+from generate_fair import generate_fair
+from utils import aggregate_raw_scores, generate_csv, load_judge_assignments, write_aggregation
+
+# rows of the synthetic raw_scores.csv processed before the rest is appended
+FIRST_BATCH = 1200
+
+
+@pytest.fixture(scope="module")
+def fair(tmp_path_factory):
+    # a small synthetic fair; each test works on its own copy
+    data_dir = tmp_path_factory.mktemp("fair")
+    generate_fair(data_dir, projects=300, judges=60, score_rows=2000, categories=6, seed=1)
+    return data_dir
+
+
+@pytest.fixture
+def data_dir(fair, tmp_path):
+    shutil.copytree(fair, tmp_path, dirs_exist_ok=True)
+    return tmp_path
+
+
+def _output(data_dir):
+    with open(f"{data_dir}/output.csv", "rb") as f:
+        return f.read()
+
+
+def _full_rebuild(data_dir, tmp_path_factory):
+    # output.csv of a from-scratch run over the same inputs, in a separate directory
+    fresh = tmp_path_factory.mktemp("full")
+    for fname in ["ids_judges.csv", "student_assignments.csv", "raw_scores.csv"]:
+        shutil.copy(f"{data_dir}/{fname}", fresh)
+    generate_csv(fresh)
+    return _output(fresh)
+
+
+def _split_raw_scores(data_dir):
+    # keeps the first FIRST_BATCH rows in raw_scores.csv, returns the remaining lines
+    with open(f"{data_dir}/raw_scores.csv", "rb") as f:
+        lines = f.readlines()
+    with open(f"{data_dir}/raw_scores.csv", "wb") as f:
+        f.writelines(lines[:FIRST_BATCH + 1])
+    return lines[FIRST_BATCH + 1:]
+
+
+def test_incremental_and_streaming_match_a_full_rebuild(data_dir, tmp_path_factory):
+    expected = _full_rebuild(data_dir, tmp_path_factory)
+    assignments = load_judge_assignments(data_dir)
+
+    generate_csv(data_dir, assignments, chunksize=300)
+    assert _output(data_dir) == expected
+
+    rest = _split_raw_scores(data_dir)
+    generate_csv(data_dir, assignments, incremental=True)
+    with open(f"{data_dir}/raw_scores.csv", "ab") as f:
+        f.writelines(rest)
+    aggregation = aggregate_raw_scores(data_dir, assignments, incremental=True)
+    # only the appended rows were aggregated
+    assert aggregation.state_projects is not None
+    assert len(aggregation.new_scores) == len(rest)
+    write_aggregation(data_dir, aggregation)
+    assert _output(data_dir) == expected
+
+    # nothing new: output.csv is kept as is
+    aggregation = aggregate_raw_scores(data_dir, assignments, incremental=True)
+    assert aggregation.partials is None
+    assert write_aggregation(data_dir, aggregation) is None
+    assert _output(data_dir) == expected
+
+
+@pytest.mark.parametrize("change", ["edit", "delete"])
+def test_changed_rows_fall_back_to_a_full_rebuild(data_dir, tmp_path_factory, change, caplog):
+    assignments = load_judge_assignments(data_dir)
+    rest = _split_raw_scores(data_dir)
+    generate_csv(data_dir, assignments, incremental=True)
+
+    with open(f"{data_dir}/raw_scores.csv", "rb") as f:
+        lines = f.readlines()
+    if change == "edit":
+        # a different judge id on an already processed row
+        fields = lines[10].split(b",")
+        fields[0] = b"ZZZ"
+        lines[10] = b",".join(fields)
+    else:
+        del lines[10]
+    with open(f"{data_dir}/raw_scores.csv", "wb") as f:
+        f.writelines(lines + rest)
+
+    with caplog.at_level("INFO"):
+        aggregation = aggregate_raw_scores(data_dir, assignments, incremental=True)
+    assert aggregation.state_projects is None
+    assert "doing a full rebuild" in caplog.text
+    write_aggregation(data_dir, aggregation)
+    assert _output(data_dir) == _full_rebuild(data_dir, tmp_path_factory)
@@ -0,0 +1,116 @@
+import csv
+
+import pytest
+
+from local_sheets import LocalSheetsClient
+from sheet_sync import upload_output
+
+HEADER = ["Category", "Student Project ID", "Student Name", "Average Total Score", "Judges Num"]
+
+
+def _output(rows):
+    return [HEADER] + [[f"Category {i % 3}", f"P{i:03d}", f"Student {i}", f"{80 + i % 7}.5", "3"]
+                       for i in rows]
+
+
+def _write_output(data_dir, rows):
+    with open(f"{data_dir}/output.csv", "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+def _sheet(client):
+    return client.spreadsheet.worksheets["aggregated_scores"].get_all_values()
+
+
+@pytest.fixture
+def uploaded(tmp_path):
+    # a first sync of 20 rows; returns (client, data_dir, rows, batch_update ranges sent after it)
+    client = LocalSheetsClient()
+    rows = _output(range(20))
+    _write_output(tmp_path, rows)
+    upload_output(client.open_by_key("key"), tmp_path)
+
+    worksheet = client.spreadsheet.worksheets["aggregated_scores"]
+    sent = []
+    batch_update = worksheet.batch_update
+
+    def recording_batch_update(data, **kwargs):
+        sent.extend(entry["range"] for entry in data)
+        return batch_update(data, **kwargs)
+
+    worksheet.batch_update = recording_batch_update
+    client.api_calls.clear()
+    return client, tmp_path, rows, sent
+
+
+def test_first_sync_creates_the_worksheet_once(tmp_path):
+    client = LocalSheetsClient()
+    rows = _output(range(20))
+    _write_output(tmp_path, rows)
+
+    assert upload_output(client.open_by_key("key"), tmp_path) == (21, 1)
+    assert client.api_calls["add_worksheet"] == 1
+    assert client.api_calls["batch_update"] == 1
+    assert _sheet(client) == rows
+
+
+def test_unchanged_output_sends_nothing(uploaded):
+    client, data_dir, rows, sent = uploaded
+
+    assert upload_output(client.open_by_key("key"), data_dir) == (21, 0)
+    assert client.api_calls["batch_update"] == 0
+    assert client.api_calls["resize"] == 0
+    assert client.api_calls["get_all_values"] == 0
+    assert _sheet(client) == rows
+
+
+def test_appended_rows_send_only_the_new_range(uploaded):
+    client, data_dir, rows, sent = uploaded
+    rows = _output(range(23))
+    _write_output(data_dir, rows)
+
+    assert upload_output(client.open_by_key("key"), data_dir) == (24, 1)
+    assert sent == ["A22:E24"]
+    assert client.api_calls["resize"] == 1
+    assert client.api_calls["batch_update"] == 1
+    assert _sheet(client) == rows
+
+
+def test_edited_cells_send_only_the_changed_ranges(uploaded):
+    client, data_dir, rows, sent = uploaded
+    rows[3][3] = "99.0"
+    rows[4][3] = "98.0"
+    rows[10][2] = "Renamed Student"
+    _write_output(data_dir, rows)
+
+    assert upload_output(client.open_by_key("key"), data_dir) == (21, 2)
+    assert sent == ["D4:D5", "C11:C11"]
+    assert client.api_calls["resize"] == 0
+    assert client.api_calls["batch_update"] == 1
+    assert _sheet(client) == rows
+
+
+def test_shrunk_output_clears_the_leftover_rows(uploaded):
+    client, data_dir, rows, sent = uploaded
+    rows = _output(range(15))
+    _write_output(data_dir, rows)
+
+    assert upload_output(client.open_by_key("key"), data_dir) == (16, 1)
+    assert sent == ["A17:E21"]
+    assert client.api_calls["resize"] == 0
+    assert client.api_calls["batch_update"] == 1
+    assert _sheet(client) == rows
+
+
+def test_recreated_worksheet_is_diffed_against_its_content(uploaded):
+    client, data_dir, rows, sent = uploaded
+    spreadsheet = client.open_by_key("key")
+    # another admin deleted and recreated the worksheet, the manifest no longer applies
+    spreadsheet.del_worksheet(spreadsheet.worksheet("aggregated_scores"))
+    spreadsheet.add_worksheet(title="aggregated_scores", rows=5, cols=2)
+    client.api_calls.clear()
+
+    assert upload_output(spreadsheet, data_dir) == (21, 1)
+    assert client.api_calls["get_all_values"] == 1
+    assert client.api_calls["resize"] == 1
+    assert _sheet(client) == rows
@@ -1,5 +1,16 @@
 import pandas as pd
+import hashlib
+import io
+import json
 import logging
+import os
+from typing import NamedTuple
+from metrics import span
+from score_tensor import ScoreTensor
+from judge_directory import JudgeDirectory
+from search_index import SearchIndex
+from snapshot import load_table, read_snapshot, write_snapshot
+from store import FairStore, output_key, store_enabled
 
 # logging.basicConfig(filename='judging.log', level=logging.INFO,
 #                     format='%(levelname)s:%(message)s')
@@ -19,10 +30,94 @@ SCORING_COLUMNS = [
     'Presentation Skills [Ability to answer questions]'
 ]
 
+JUDGE_COLUMNS = [f"Judge {j}" for j in range(1, 7)]
 
-def generate_csv(data_dir):
-    scores = pd.read_csv(f"{data_dir}/raw_scores.csv")
-    student_assignments = pd.read_csv(f"{data_dir}/student_assignments.csv")
+# running sums/counts/judge sets so appended score rows can be processed incrementally
+AGGREGATION_STATE_FILE = "aggregation_state.json"
+
+# ids are kept as typed (e.g. "007"), every read of raw_scores.csv uses the same dtypes
+RAW_SCORES_DTYPES = {'Student Project ID': str, 'Judge ID': str}
+RAW_SCORES_COLUMNS = ['Student Project ID', 'Judge ID', *SCORING_COLUMNS]
+
+# score rows parsed at a time by generate_csv(..., chunksize=...)
+STREAM_CHUNK_ROWS = 50_000
+
+
+class JudgeAssignments(NamedTuple):
+    # project id -> sorted list of assigned judge ids
+    project_dict: dict
+    # one row per judge cell / project that could not be resolved (Resolved False, e.g. a
+    # misspelled name, Candidates then suggests the closest judge) or only matched loosely,
+    # e.g. name words in a different order (Resolved True, counted in project_dict)
+    issues: pd.DataFrame
+    # long form (Student Project ID, Judge ID) of every resolved assignment
+    assigned: pd.DataFrame
+    # every project id in student_assignments.csv / judge id in ids_judges.csv, normalized
+    project_ids: pd.Index
+    judge_ids: pd.Index
+
+
+# validity findings, one row per issue; only 'error' fails verification
+ISSUE_COLUMNS = ['Severity', 'Check', 'Student Project ID', 'Judge ID', 'Message']
+SEVERITIES = ['error', 'warning', 'info']
+VALIDITY_ISSUES_FILE = "validity_issues.csv"
+
+
+class FairState(NamedTuple):
+    # everything the dashboard reads, None for files that don't exist yet
+    output_df: pd.DataFrame
+    ids_judges_df: pd.DataFrame
+    judge_index: dict
+    student_search: SearchIndex
+    judge_search: SearchIndex
+    issues_df: pd.DataFrame
+    score_tensor: ScoreTensor
+
+
+# judge id -> judged / assigned / pending projects, written next to output.csv
+JUDGE_INDEX_FILE = "judge_index.json"
+
+# files FairState is built from, a change to any of them invalidates it
+FAIR_STATE_FILES = ["output.csv", "ids_judges.csv", "student_assignments.csv", "raw_scores.csv",
+                    JUDGE_INDEX_FILE, VALIDITY_ISSUES_FILE]
+
+
+class ScorePartials(NamedTuple):
+    # running per-project totals, indexed by Student Project ID
+    sums: pd.DataFrame
+    counts: pd.DataFrame
+    judges: pd.Series
+    # score rows per (Student Project ID, Judge ID), more than one is a duplicate entry
+    rows: pd.Series
+
+
+class RowsFingerprint(NamedTuple):
+    # the raw_scores.csv bytes an aggregation covers: length, sha256, ends with a newline
+    offset: int
+    sha256: str
+    complete: bool
+
+
+class Aggregation(NamedTuple):
+    # aggregate_raw_scores() result, nothing is written until write_aggregation()
+    final_df: pd.DataFrame
+    # None when an incremental run found no new rows (final_df is output.csv as is)
+    partials: ScorePartials
+    fingerprint: RowsFingerprint
+    input_hashes: dict
+    # per-project state an incremental update extends, None after a full rebuild
+    state_projects: dict
+    # normalized score rows parsed from in-memory bytes, snapshotted once raw_scores.csv is written
+    scores: pd.DataFrame
+    # incremental runs: the new score rows and the fingerprint of the rows they extend
+    new_scores: pd.DataFrame = None
+    base_sha256: str = None
+    # resolved (Student Project ID, Judge ID) assignments the results were built with
+    assigned: pd.DataFrame = None
+
+
+def _build_student_assignments(path):
+    student_assignments = pd.read_csv(path)
 
     # forward fill student_assignments to get category for each project id
     mask = student_assignments['ID (project)'].notna()
@@ -34,40 +129,96 @@ def generate_csv(data_dir):
 
     # send to csv to inspect (debug)
     # student_assignments.to_csv(f"{data_dir}/student_assignments_filled.csv", index=False)
+    return student_assignments.reset_index(drop=True)
 
-    logger.info(f"Number of judging entries: {len(scores)}")
 
-    # merge scores with category info so all student data in one df based on project id
-    merged = scores.merge(
-        student_assignments[['ID (project)', 'Category',
-                        'Student First Name', 'Student Last Name', 'Title of Presentation']],
-        left_on='Student Project ID',
-        right_on='ID (project)',
-        how='left'
-    )
+def read_student_assignments(data_dir):
+    # forward filled, from the binary snapshot when student_assignments.csv hasn't changed
+    return load_table(data_dir, "student_assignments.csv", _build_student_assignments)
+
+
+def read_ids_judges(data_dir):
+    return load_table(data_dir, "ids_judges.csv", pd.read_csv)
+
+
+def read_output(data_dir):
+    output_df = read_snapshot(data_dir, "output.csv")
+    if output_df is None:
+        output_df = pd.read_csv(f"{data_dir}/output.csv", dtype={
+            'Student Project ID': str, 'Judges Had': str, 'Assigned Judges': str})
+    return output_df
+
+
+def read_scores(data_dir):
+    # normalized score rows, from the snapshot when raw_scores.csv is unchanged
+    return load_table(data_dir, "raw_scores.csv", lambda path: normalize_scores(
+        pd.read_csv(path, dtype=RAW_SCORES_DTYPES)))
 
-    merged = merged.drop(columns=['ID (project)'])
-    merged['Student Project ID'] = merged['Student Project ID'].astype(
+
+def _write_atomic(path, write, mode="w"):
+    # write(f) fills a temp file that then replaces path, readers never see a partial file
+    with open(f"{path}.tmp", mode, **({} if "b" in mode else {'newline': ""})) as f:
+        write(f)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_output(data_dir, final_df):
+    # returns the csv text, so e.g. the upload doesn't have to read output.csv back
+    text = final_df.to_csv(index=False)
+    _write_atomic(f"{data_dir}/output.csv", lambda f: f.write(text))
+    write_snapshot(data_dir, "output.csv", final_df.reset_index(drop=True))
+    save_judge_index(data_dir, final_df)
+    return text
+
+
+def normalize_scores(scores):
+    scores = scores.copy()
+    scores['Student Project ID'] = scores['Student Project ID'].astype(
         str).str.strip().str.upper()
-    merged['Judge ID'] = merged['Judge ID'].astype(str).str.strip().str.upper()
+    scores['Judge ID'] = scores['Judge ID'].astype(str).str.strip().str.upper()
 
     for col in SCORING_COLUMNS:
-        merged[col] = pd.to_numeric(merged[col], errors='coerce')
-
-    # group dataframe by identical project IDs, calc score means, take first student name, etc.
-    results = merged.groupby(['Student Project ID']).agg({
-        **{col: 'mean' for col in SCORING_COLUMNS},
-        # x is the series of judge IDs
-        'Judge ID': lambda x: ','.join(sorted(set(x.astype(str)))),
-        'Student First Name': 'first',
-        'Student Last Name': 'first',
-        'Category': 'first',
-        'Title of Presentation': 'first'
-    }).reset_index()
-
-    results = results.rename(columns={
-        'Judge ID': 'Judges Had',
-    })
+        scores[col] = pd.to_numeric(scores[col], errors='coerce')
+    return scores
+
+
+def aggregate_scores(scores):
+    # sums/counts instead of means so partial results from separate batches can be combined
+    grouped = scores.groupby('Student Project ID')
+    return ScorePartials(
+        grouped[SCORING_COLUMNS].sum(),
+        grouped[SCORING_COLUMNS].count(),
+        grouped['Judge ID'].agg(set),
+        scores.groupby(['Student Project ID', 'Judge ID']).size(),
+    )
+
+
+def combine_partials(first, second):
+    judges = pd.concat([first.judges, second.judges])
+    return ScorePartials(
+        first.sums.add(second.sums, fill_value=0),
+        first.counts.add(second.counts, fill_value=0).astype(int),
+        judges.groupby(level=0).agg(lambda x: set().union(*x)),
+        first.rows.add(second.rows, fill_value=0).astype(int),
+    )
+
+
+def finalize_results(partials, student_assignments, project_dict):
+    # means per scoring column, NaN where a project has no numeric score for that column
+    results = partials.sums.div(partials.counts.where(partials.counts > 0))
+    results['Judges Had'] = partials.judges.apply(
+        lambda x: ','.join(sorted(x)))
+    results = results.rename_axis('Student Project ID').reset_index()
+
+    # attach student info by project id
+    student_info = student_assignments[['ID (project)', 'Category',
+                                        'Student First Name', 'Student Last Name', 'Title of Presentation']].copy()
+    student_info['Student Project ID'] = student_info.pop(
+        'ID (project)').astype(str).str.strip().str.upper()
+    student_info = student_info.drop_duplicates(
+        'Student Project ID').set_index('Student Project ID')
+    results = results.join(student_info, on='Student Project ID')
+
     results['Judges Num'] = results['Judges Had'].apply(
         lambda x: len(x.split(',')) if pd.notna(x) else 0)
 
@@ -85,154 +236,658 @@ def generate_csv(data_dir):
     # print("results columns after processing", results.columns)
     final_df = results[final_cols].copy()
 
-    # Sort by category and score
-    final_df = final_df.sort_values(
-        by=['Category', 'Average Total Score'],
-        ascending=[True, False]
-    )
-
     # add Assigned Judges column based on student_assignments and ids_judges
-    ids_judges_df = pd.read_csv(f"{data_dir}/ids_judges.csv")
-    project_dict = get_necessary_judges(
-        student_assignments, ids_judges_df, final_df)
     final_df['Assigned Judges'] = final_df['Student Project ID'].apply(
         lambda x: ','.join(project_dict[x]) if x in project_dict else '')
 
-    output_table = ""
-    for category, group_df in final_df.groupby('Category'):
-        output_table += f"**{category}**\n\n"
-        output_table += group_df.to_markdown(index=False) + "\n\n"
+    return sort_results(final_df)
 
-    final_df.to_csv(f"{data_dir}/output.csv", index=False)
 
-    return final_df
+def sort_results(final_df):
+    # Sort by category and score, project id breaks ties so full and incremental runs agree
+    return final_df.sort_values(
+        by=['Category', 'Average Total Score', 'Student Project ID'],
+        ascending=[True, False, True]
+    )
 
 
-def get_necessary_judges(student_assignments, ids_judges, output):
-    project_dict = {}
-    for index, row in output.iterrows():
-        # get the row associated with the current project id
-        project_id = row['Student Project ID']
-
-        student_assignments_row = student_assignments[student_assignments['ID (project)']
-                                            == project_id]
-        judges = []
-        if len(student_assignments_row) != 1:
-            logger.error(
-                f"Student Project ID {project_id} not found or duplicated in student_assignments.csv")
-            continue
-
-        # print("current project id", project_id)
-        for j in range(1, 7):
-            if pd.isna(student_assignments_row[f"Judge {j}"].values[0]):
-                continue
-            judges.append(
-                str(student_assignments_row[f"Judge {j}"].values[0]).upper())
-
-        project_dict[project_id] = []
-        for judge in judges:
-            # Handle judge names - split on first space
-            judge_parts = judge.split(" ", 1)
-            if len(judge_parts) != 2:
-                logger.warning(
-                    f"Judge name '{judge}' does not contain first and last name")
-                continue
-
-            fname = judge_parts[0].upper()
-            lname = judge_parts[1].upper()
-            judge_id = [ids_judges.loc[judgeidx]["JUDGE ID"].upper() for judgeidx in range(len(
-                ids_judges)) if ids_judges.loc[judgeidx]["FIRST"].upper() == fname and ids_judges.loc[judgeidx]["LAST"].upper() == lname]
-            if len(judge_id) != 1:
-                logger.warning(
-                    f"number of judge ids for judge {judge} found is {len(judge_id)}")
+def generate_csv(data_dir, assignments=None, incremental=False, chunksize=None):
+    # chunksize streams raw_scores.csv instead of loading it whole, memory then grows
+    # with the number of projects rather than the number of score rows
+    aggregation = aggregate_raw_scores(
+        data_dir, assignments, incremental=incremental, chunksize=chunksize)
+    write_aggregation(data_dir, aggregation)
+    return aggregation.final_df
+
+
+def aggregate_raw_scores(data_dir, assignments=None, raw=None, incremental=False, chunksize=None):
+    # raw: raw_scores.csv content already in memory (e.g. just downloaded), otherwise
+    # it's read from data_dir; writes nothing, see write_aggregation()
+    student_assignments = read_student_assignments(data_dir)
+
+    if assignments is None:
+        with span("resolve assignments") as s:
+            assignments = resolve_judge_assignments(
+                student_assignments, read_ids_judges(data_dir))
+            s['rows'] = len(assignments.project_dict)
+
+    input_hashes = _input_hashes(data_dir)
+
+    if incremental:
+        aggregation = _aggregate_incremental(
+            data_dir, raw, input_hashes, student_assignments, assignments.project_dict)
+        if aggregation is not None:
+            return aggregation._replace(assigned=assignments.assigned)
+
+    scores = None
+    if chunksize and raw is None:
+        with span("aggregate (streaming)") as s:
+            partials, fingerprint, s['rows'] = stream_partials(
+                f"{data_dir}/raw_scores.csv", chunksize)
+        logger.info(f"Number of judging entries: {s['rows']}")
+    else:
+        if raw is None:
+            with span("read raw scores") as s:
+                with open(f"{data_dir}/raw_scores.csv", "rb") as f:
+                    raw = f.read()
+                s['rows'] = raw.count(b"\n")
+            # normalized + typed scores come from the snapshot when raw_scores.csv is unchanged
+            with span("normalize") as s:
+                normalized = load_table(data_dir, "raw_scores.csv", lambda path: normalize_scores(
+                    pd.read_csv(io.BytesIO(raw), dtype=RAW_SCORES_DTYPES)))
+                s['rows'] = len(normalized)
+        else:
+            with span("normalize") as s:
+                normalized = scores = normalize_scores(
+                    pd.read_csv(io.BytesIO(raw), dtype=RAW_SCORES_DTYPES))
+                s['rows'] = len(normalized)
+        fingerprint = _fingerprint(raw)
+        logger.info(f"Number of judging entries: {len(normalized)}")
+
+        # group by identical project IDs
+        with span("aggregate") as s:
+            partials = aggregate_scores(normalized)
+            s['rows'] = len(partials.sums)
+
+    # average and attach student data per project
+    with span("finalize") as s:
+        final_df = finalize_results(
+            partials, student_assignments, assignments.project_dict)
+        s['rows'] = len(final_df)
+
+    return Aggregation(final_df, partials, fingerprint, input_hashes, None, scores,
+                       assigned=assignments.assigned)
+
+
+def write_aggregation(data_dir, aggregation):
+    # writes output.csv (+ snapshot, judge index) and the incremental state; returns the
+    # output csv text, or None if there was nothing new to write
+    if aggregation.partials is None:
+        return None
+    with span("write output", rows=len(aggregation.final_df)):
+        text = write_output(data_dir, aggregation.final_df)
+        projects = aggregation.state_projects or {}
+        projects.update(_state_entries(aggregation.partials))
+        _save_aggregation_state(data_dir, aggregation.fingerprint,
+                                aggregation.input_hashes, projects)
+        if aggregation.scores is not None:
+            write_snapshot(data_dir, "raw_scores.csv", aggregation.scores)
+    if store_enabled():
+        with span("write store", rows=len(aggregation.final_df)):
+            write_store(data_dir, aggregation)
+    return text
+
+
+def write_store(data_dir, aggregation):
+    # refreshes the sqlite store (FAIR_STORE=sqlite) from a run's results; new score rows are
+    # appended when the store holds exactly the rows they extend, otherwise all rows are reloaded
+    store = FairStore(data_dir)
+    if aggregation.base_sha256 is not None and store.rows_sha256() == aggregation.base_sha256:
+        score_chunks, append = [aggregation.new_scores], True
+    elif aggregation.scores is not None:
+        score_chunks, append = [aggregation.scores], False
+    else:
+        score_chunks, append = (normalize_scores(chunk) for chunk in pd.read_csv(
+            f"{data_dir}/raw_scores.csv", dtype=RAW_SCORES_DTYPES, chunksize=STREAM_CHUNK_ROWS)), False
+
+    student_assignments = read_student_assignments(data_dir)
+    projects = pd.DataFrame({
+        'project_id': student_assignments['ID (project)'].astype(str).str.strip().str.upper(),
+        'category': student_assignments['Category'],
+        'student_first': student_assignments['Student First Name'],
+        'student_last': student_assignments['Student Last Name'],
+        'title': student_assignments['Title of Presentation'],
+    })
+    ids_judges = read_ids_judges(data_dir)
+    judges = pd.DataFrame({
+        'judge_id': ids_judges['JUDGE ID'].astype(str).str.strip().str.upper(),
+        'first': ids_judges['FIRST'],
+        'last': ids_judges['LAST'],
+    })
+    store.write(aggregation.final_df, projects, judges, aggregation.assigned, score_chunks,
+                SCORING_COLUMNS, append, aggregation.fingerprint.sha256, output_key(data_dir))
+
+
+def load_fair_state(data_dir):
+    def read_if_exists(fname):
+        path = f"{data_dir}/{fname}"
+        return pd.read_csv(path) if os.path.exists(path) else None
+
+    output_df = read_output(data_dir) if os.path.exists(
+        f"{data_dir}/output.csv") else None
+    judge_index = None
+    if os.path.exists(f"{data_dir}/{JUDGE_INDEX_FILE}"):
+        with open(f"{data_dir}/{JUDGE_INDEX_FILE}") as f:
+            judge_index = json.load(f)
+    elif output_df is not None:
+        # output.csv from before the index existed
+        judge_index = build_judge_index(output_df)
+
+    ids_judges_df = read_ids_judges(data_dir) if os.path.exists(
+        f"{data_dir}/ids_judges.csv") else None
+
+    score_tensor = None
+    if all(os.path.exists(f"{data_dir}/{fname}") for fname in
+           ["raw_scores.csv", "student_assignments.csv", "ids_judges.csv"]):
+        score_tensor = build_score_tensor(
+            read_scores(data_dir), load_judge_assignments(data_dir))
+
+    return FairState(
+        output_df=output_df,
+        ids_judges_df=ids_judges_df,
+        judge_index=judge_index,
+        student_search=SearchIndex(output_df, [
+            'Student Name', 'Student Project ID', 'Title of Presentation']) if output_df is not None else None,
+        judge_search=SearchIndex(ids_judges_df, [
+            'FIRST', 'LAST', 'JUDGE ID']) if ids_judges_df is not None else None,
+        issues_df=read_if_exists(VALIDITY_ISSUES_FILE),
+        score_tensor=score_tensor,
+    )
+
+
+def build_score_tensor(scores, assignments):
+    return ScoreTensor.from_frames(scores, assignments.assigned, SCORING_COLUMNS,
+                                   project_ids=assignments.project_ids, judge_ids=assignments.judge_ids)
+
+
+def build_judge_index(final_df):
+    projects = pd.DataFrame({
+        'id': final_df['Student Project ID'],
+        'student': final_df['Student Name'],
+        'category': final_df['Category'],
+        'score': final_df['Average Total Score'],
+    })
+    # NaN isn't valid json
+    projects = projects.astype(object).where(projects.notna(), None)
+
+    def by_judge(column):
+        # one row per (judge, project) pair, in output order
+        judge_ids = final_df[column].fillna('').astype(str).str.split(',')
+        pairs = projects.assign(judge=judge_ids).explode('judge')
+        pairs['judge'] = pairs['judge'].str.strip().str.upper()
+        return pairs[pairs['judge'] != '']
+
+    judged = by_judge('Judges Had')
+    assigned = by_judge('Assigned Judges')
+    pending = assigned.merge(judged[['judge', 'id']].drop_duplicates(),
+                             on=['judge', 'id'], how='left', indicator=True)
+    pending = pending[pending['_merge'] == 'left_only'].drop(columns='_merge')
+
+    judge_index = {}
+    for key, pairs in [('judged', judged), ('assigned', assigned), ('pending', pending)]:
+        # one to_dict for the whole frame, slicing per judge is far slower with many judges
+        for judge_id, record in zip(pairs['judge'], pairs.drop(columns='judge').to_dict('records')):
+            entry = judge_index.setdefault(
+                judge_id, {'judged': [], 'assigned': [], 'pending': []})
+            entry[key].append(record)
+    return judge_index
+
+
+def save_judge_index(data_dir, final_df):
+    judge_index = build_judge_index(final_df)
+    _write_atomic(f"{data_dir}/{JUDGE_INDEX_FILE}",
+                  lambda f: json.dump(judge_index, f))
+
+
+def _input_hashes(data_dir):
+    # output rows depend on these too, any change to them forces a full rebuild
+    hashes = {}
+    for fname in ["student_assignments.csv", "ids_judges.csv"]:
+        with open(f"{data_dir}/{fname}", "rb") as f:
+            hashes[fname] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def _state_entries(partials):
+    judge_rows = {}
+    for (project_id, judge_id), rows in zip(partials.rows.index, partials.rows.values.tolist()):
+        judge_rows.setdefault(project_id, {})[judge_id] = rows
+    return {
+        project_id: {'sums': sums, 'counts': counts, 'judges': sorted(judges),
+                     'judge_rows': judge_rows.get(project_id, {})}
+        for project_id, sums, counts, judges in zip(
+            partials.sums.index, partials.sums.values.tolist(),
+            partials.counts.values.astype(int).tolist(), partials.judges.reindex(partials.sums.index))
+    }
+
+
+def _state_score_rows(projects):
+    # ScorePartials.rows of every project in the aggregation state
+    pairs = [(project_id, judge_id, rows) for project_id, entry in projects.items()
+             for judge_id, rows in entry['judge_rows'].items()]
+    return pd.DataFrame(pairs, columns=['Student Project ID', 'Judge ID', 'Rows']).set_index(
+        ['Student Project ID', 'Judge ID'])['Rows']
+
+
+def aggregation_score_rows(aggregation):
+    # score rows per (project, judge) of everything the aggregation's final_df covers,
+    # None when there was nothing new (read_score_rows() then has them)
+    if aggregation.partials is None:
+        return None
+    if aggregation.state_projects is None:
+        return aggregation.partials.rows
+    return _state_score_rows({**aggregation.state_projects, **_state_entries(aggregation.partials)})
+
+
+def read_score_rows(data_dir):
+    # score rows per (project, judge) of the last run, from the aggregation state if it was
+    # kept, otherwise counted from raw_scores.csv
+    state_path = f"{data_dir}/{AGGREGATION_STATE_FILE}"
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            projects = json.load(f)['projects']
+        if all('judge_rows' in entry for entry in projects.values()):
+            return _state_score_rows(projects)
+    if not os.path.exists(f"{data_dir}/raw_scores.csv"):
+        return None
+    return read_scores(data_dir).groupby(['Student Project ID', 'Judge ID']).size()
+
+
+def _fingerprint(raw):
+    return RowsFingerprint(len(raw), hashlib.sha256(raw).hexdigest(), raw.endswith(b"\n"))
+
+
+class _HashingReader:
+    # file wrapper that fingerprints exactly the bytes pandas reads through it
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.last = b""
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        if data:
+            self.sha256.update(data)
+            self.size += len(data)
+            self.last = data[-1:]
+        return data
+
+    def __iter__(self):
+        # pandas only treats objects with read() and __iter__ as file handles
+        return iter(lambda: self.read(1 << 16), b"")
+
+    def fingerprint(self):
+        return RowsFingerprint(self.size, self.sha256.hexdigest(), self.last == b"\n")
+
+
+def stream_partials(path, chunksize=STREAM_CHUNK_ROWS):
+    # (partials, fingerprint, score rows) of a raw_scores.csv read chunk by chunk; only
+    # running sums/counts and row counts per (project, judge) pair are kept between chunks
+    sums = counts = pairs = None
+    rows = 0
+    with open(path, "rb") as f:
+        reader = _HashingReader(f)
+        for chunk in pd.read_csv(reader, chunksize=chunksize, usecols=RAW_SCORES_COLUMNS,
+                                 dtype=RAW_SCORES_DTYPES):
+            chunk = normalize_scores(chunk)
+            rows += len(chunk)
+            grouped = chunk.groupby('Student Project ID')
+            chunk_sums = grouped[SCORING_COLUMNS].sum()
+            chunk_counts = grouped[SCORING_COLUMNS].count()
+            chunk_pairs = chunk.groupby(['Student Project ID', 'Judge ID']).size()
+            if sums is None:
+                sums, counts, pairs = chunk_sums, chunk_counts, chunk_pairs
             else:
-                judge_id = judge_id[0]
-                project_dict[project_id].append(judge_id)
-        project_dict[project_id] = sorted(project_dict[project_id])
+                sums = sums.add(chunk_sums, fill_value=0)
+                counts = counts.add(chunk_counts, fill_value=0).astype(int)
+                pairs = pairs.add(chunk_pairs, fill_value=0).astype(int)
+        fingerprint = reader.fingerprint()
+
+    if sums is None:
+        return aggregate_scores(pd.DataFrame(columns=RAW_SCORES_COLUMNS)), fingerprint, 0
+    judges = pairs.reset_index().groupby('Student Project ID')['Judge ID'].agg(set)
+    return ScorePartials(sums, counts, judges, pairs), fingerprint, rows
+
+
+def _save_aggregation_state(data_dir, fingerprint, input_hashes, projects):
+    state_path = f"{data_dir}/{AGGREGATION_STATE_FILE}"
+    if not fingerprint.complete:
+        # can't tell an appended row from an edited last row, next run rebuilds
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return
+
+    state = {
+        'columns': SCORING_COLUMNS,
+        'inputs': input_hashes,
+        'rows_offset': fingerprint.offset,
+        'rows_sha256': fingerprint.sha256,
+        'projects': projects,
+    }
+    _write_atomic(state_path, lambda f: json.dump(state, f))
+
+
+def _load_partials(state, project_ids):
+    entries = [state['projects'][project_id]
+               for project_id in project_ids if project_id in state['projects']]
+    index = pd.Index([project_id for project_id in project_ids if project_id in state['projects']],
+                     name='Student Project ID')
+    return ScorePartials(
+        pd.DataFrame([e['sums'] for e in entries],
+                     index=index, columns=SCORING_COLUMNS, dtype=float),
+        pd.DataFrame([e['counts'] for e in entries],
+                     index=index, columns=SCORING_COLUMNS, dtype=int),
+        pd.Series([set(e['judges']) for e in entries],
+                  index=index, name='Judge ID', dtype=object),
+        _state_score_rows(dict(zip(index, entries))).astype(int),
+    )
 
-    return project_dict
 
+def _hash_prefix(f, length):
+    # sha256 object over the first length bytes of f, None if f is shorter
+    digest = hashlib.sha256()
+    while length > 0:
+        block = f.read(min(length, 1 << 20))
+        if not block:
+            return None
+        digest.update(block)
+        length -= len(block)
+    return digest
+
+
+def _aggregate_incremental(data_dir, raw, input_hashes, student_assignments, project_dict):
+    # returns None whenever a full rebuild is needed; only the new tail of the raw scores is parsed
+    state_path = f"{data_dir}/{AGGREGATION_STATE_FILE}"
+    output_path = f"{data_dir}/output.csv"
+    if not os.path.exists(state_path) or not os.path.exists(output_path):
+        return None
+
+    with open(state_path) as f:
+        state = json.load(f)
+    offset = state['rows_offset']
+    if state['columns'] != SCORING_COLUMNS or state['inputs'] != input_hashes:
+        logger.info("Inputs or scoring columns changed, doing a full rebuild")
+        return None
+    if not all('judge_rows' in entry for entry in state['projects'].values()):
+        logger.info("Aggregation state has no per-judge row counts, doing a full rebuild")
+        return None
+    with (io.BytesIO(raw) if raw is not None else open(f"{data_dir}/raw_scores.csv", "rb")) as f:
+        digest = _hash_prefix(f, offset)
+        if digest is None or digest.hexdigest() != state['rows_sha256']:
+            logger.info(
+                "Previously processed scores were edited or deleted, doing a full rebuild")
+            return None
+        tail = f.read()
+        f.seek(0)
+        header = f.readline()
+
+    output_df = read_output(data_dir)
+    if not tail.strip():
+        logger.info("No new judging entries")
+        return Aggregation(output_df, None, None, input_hashes, None, None)
+
+    digest.update(tail)
+    fingerprint = RowsFingerprint(offset + len(tail), digest.hexdigest(), tail.endswith(b"\n"))
+    with span("normalize") as s:
+        new_scores = normalize_scores(pd.read_csv(
+            io.BytesIO(header + tail), dtype=RAW_SCORES_DTYPES))
+        s['rows'] = len(new_scores)
+    logger.info(f"Number of new judging entries: {len(new_scores)}")
+
+    with span("aggregate (incremental)") as s:
+        new_partials = aggregate_scores(new_scores)
+        touched = new_partials.sums.index
+        partials = combine_partials(_load_partials(state, touched), new_partials)
+
+        # only the touched projects' lines are recomputed, the rest of output.csv is kept as is
+        updated_df = finalize_results(partials, student_assignments, project_dict)
+        final_df = pd.concat([
+            output_df[~output_df['Student Project ID'].isin(touched)],
+            updated_df,
+        ], ignore_index=True)
+        final_df = sort_results(final_df)
+        s['rows'] = len(updated_df)
+
+    return Aggregation(final_df, partials, fingerprint, input_hashes, state['projects'], None,
+                       new_scores=new_scores, base_sha256=state['rows_sha256'])
+
+
+def resolve_judge_assignments(student_assignments, ids_judges, directory=None):
+    # melt Judge 1..6 into one long table and look every distinct name up in the judge directory
+    projects = student_assignments[student_assignments['ID (project)'].notna()].copy()
+    projects['Student Project ID'] = projects['ID (project)'].astype(
+        str).str.strip().str.upper()
 
-def verify_validity(final_scores, data_dir):
+    duplicated = projects['Student Project ID'].duplicated(keep=False)
+    duplicate_issues = pd.DataFrame({
+        'Student Project ID': projects.loc[duplicated, 'Student Project ID'].unique(),
+        'Judge Name': '',
+        'Issue': 'duplicate project id',
+        'Candidates': '',
+        'Resolved': False,
+    })
+    projects = projects[~duplicated]
+
+    judge_cols = [col for col in JUDGE_COLUMNS if col in projects.columns]
+    cells = projects.melt(
+        id_vars=['Student Project ID'], value_vars=judge_cols,
+        var_name='Slot', value_name='Judge Name'
+    ).dropna(subset=['Judge Name'])
+    cells = cells[cells['Judge Name'].astype(str).str.strip() != '']
+
+    if directory is None:
+        directory = JudgeDirectory(ids_judges)
+    cells = cells.join(directory.resolve(cells['Judge Name']))
+
+    # a name that matches nobody is most likely missing its first or last name
+    malformed = ~cells['Judge Name'].astype(str).str.strip().str.contains(r"\s", regex=True)
+    cells['Issue'] = ''
+    cells.loc[cells['Matches'] == 0, 'Issue'] = 'no matching judge'
+    cells.loc[(cells['Matches'] == 0) & malformed, 'Issue'] = 'missing first or last name'
+    cells.loc[cells['Matches'] > 1, 'Issue'] = 'ambiguous judge name'
+    # a misspelling is only a suggestion, the closest name can belong to the wrong judge
+    # (e.g. "Jhon Smith" is closer to Jon Smith than to John Smith) so it's never counted
+    fuzzy = (cells['Matches'] == 1) & (cells['Match'] == 'fuzzy')
+    cells.loc[fuzzy, 'Issue'] = cells.loc[fuzzy].apply(
+        lambda r: f"possible misspelling of {r['Candidates']} (confidence {r['Confidence']:.2f})", axis=1)
+    # resolved, but worth a look
+    cells.loc[(cells['Matches'] == 1) & (cells['Match'] == 'reordered'), 'Issue'] = 'name words in a different order'
+    cells['Resolved'] = (cells['Matches'] == 1) & ~fuzzy
+
+    resolved = cells[cells['Resolved']]
+    by_project = resolved.groupby('Student Project ID')['Candidates'].agg(sorted).to_dict()
+    project_dict = {project_id: by_project.get(project_id, [])
+                    for project_id in projects['Student Project ID']}
+
+    issues = pd.concat([
+        duplicate_issues,
+        cells.loc[cells['Issue'] != '', ['Student Project ID', 'Judge Name', 'Issue', 'Candidates', 'Resolved']],
+    ], ignore_index=True)
+    unresolved = issues[~issues['Resolved']]
+    if len(unresolved) > 0:
+        logger.warning(
+            f"{len(unresolved)} judge assignment(s) could not be resolved:\n{unresolved.to_string(index=False)}")
+    if len(unresolved) < len(issues):
+        logger.info(
+            f"{len(issues) - len(unresolved)} judge name(s) matched loosely:\n{issues[issues['Resolved']].to_string(index=False)}")
+
+    return JudgeAssignments(
+        project_dict, issues,
+        assigned=resolved[['Student Project ID', 'Candidates']].rename(
+            columns={'Candidates': 'Judge ID'}).reset_index(drop=True),
+        project_ids=pd.Index(student_assignments['ID (project)'].dropna().astype(
+            str).str.strip().str.upper().unique()),
+        judge_ids=directory.judge_ids,
+    )
 
-    ids_judges = pd.read_csv(f"{data_dir}/ids_judges.csv")
-    judge_ids_list = [str(x).strip().upper()
-                      for x in ids_judges['JUDGE ID'].tolist()]
 
-    student_assignments = pd.read_csv(f"{data_dir}/student_assignments.csv")
-    id_list = [str(x).strip().upper()
-               for x in student_assignments['ID (project)'].tolist()]
-
-    project_dict = get_necessary_judges(
-        student_assignments, ids_judges, final_scores)
-
-    passed = True
-
-    for i, row in final_scores.iterrows():
-        # confirm that Judges Num matches the number of unique judges in Judges Had
-        project_id = row['Student Project ID']
-        judges_had = [x.strip()
-                      for x in str(row['Judges Had']).split(",") if x.strip()]
-        unique_judges_had = set(judges_had)
-        if len(unique_judges_had) != row['Judges Num']:
-            text = f"all judges should be unique for {project_id}, got {judges_had}"
-            # a real problem, duplicate entries cannot exist!!
-            logger.error(text)
-            passed = False
-
-        if project_id not in project_dict:
-            logger.error(f"Project {project_id} not found in project_dict")
-            passed = False
-            continue
-
-        # confirm that all judges in Judges Had are in the allowed judges list
-        for judge_id in unique_judges_had:
-            if judge_id not in project_dict[project_id]:
-                text = f"Judge {judge_id} for {project_id} not in allowed list {project_dict[project_id]}!"
-                # this may be a problem but if more judges show up than expected then disregard
-                logger.warning(text)
-                # passed = False
-
-        required_judges = len(project_dict[project_id])
-        if len(unique_judges_had) < required_judges:
-            # a real problem - each project must have enough judges
-            logger.error(
-                f"Project {project_id} has {len(unique_judges_had)} judges but was assigned {required_judges}")
-            passed = False
-
-    return passed
+def load_judge_assignments(data_dir):
+    # resolve once per run and pass the result to generate_csv and verify_validity
+    with span("resolve assignments") as s:
+        assignments = resolve_judge_assignments(
+            read_student_assignments(data_dir), read_ids_judges(data_dir))
+        s['rows'] = len(assignments.project_dict)
+    return assignments
+
+
+def get_necessary_judges(student_assignments, ids_judges, output):
+    # kept for callers of the old per-project api
+    project_dict = resolve_judge_assignments(
+        student_assignments, ids_judges).project_dict
+    project_ids = set(output['Student Project ID'])
+    return {project_id: judges for project_id, judges in project_dict.items()
+            if project_id in project_ids}
+
+
+def find_issues(final_scores, assignments, score_rows=None):
+    # every check is a join / set operation over the whole table, no per-row loops;
+    # score_rows (see ScorePartials.rows) enables the duplicate judges check
+    project_dict = assignments.project_dict
+    issues = []
+
+    def add(rows, severity, check, message):
+        if len(rows) > 0:
+            issues.append(pd.DataFrame({
+                'Severity': severity,
+                'Check': check,
+                'Student Project ID': rows['Student Project ID'].to_numpy() if 'Student Project ID' in rows else '',
+                'Judge ID': rows['Judge ID'].to_numpy() if 'Judge ID' in rows else '',
+                'Message': rows.apply(message, axis=1).to_numpy(),
+            }))
+
+    project_ids = final_scores['Student Project ID'].astype(str)
+    judged = pd.DataFrame({
+        'Student Project ID': project_ids,
+        'Judge ID': final_scores['Judges Had'].fillna('').astype(str).str.split(','),
+    }).explode('Judge ID')
+    judged['Judge ID'] = judged['Judge ID'].str.strip()
+    judged = judged[judged['Judge ID'] != '']
+
+    judged = judged.drop_duplicates()
+    counts = pd.DataFrame({
+        'Student Project ID': project_ids.to_numpy(),
+        'Unique': judged.groupby('Student Project ID').size().reindex(project_ids, fill_value=0).to_numpy(),
+    })
+
+    # a real problem, a judge should score each project only once!!
+    if score_rows is not None:
+        repeated = score_rows[score_rows > 1].rename('Rows').reset_index()
+        repeated = repeated[repeated['Student Project ID'].isin(project_ids)]
+        add(repeated, 'error', 'duplicate judges',
+            lambda r: f"Judge {r['Judge ID']} scored {r['Student Project ID']} {r['Rows']} times, all judges should be unique")
+
+    registered = counts['Student Project ID'].isin(project_dict.keys())
+    add(counts[~registered], 'error', 'unregistered project',
+        lambda r: f"Project {r['Student Project ID']} has scores but no (unique) entry in student_assignments.csv")
+
+    add(judged[~judged['Judge ID'].isin(assignments.judge_ids)], 'warning', 'unknown judge',
+        lambda r: f"Judge {r['Judge ID']} scored {r['Student Project ID']} but is not in ids_judges.csv")
+
+    # this may be a problem but if more judges show up than expected then disregard
+    assigned = assignments.assigned.drop_duplicates()
+    extra = judged[judged['Student Project ID'].isin(project_dict.keys())].merge(
+        assigned, how='left', indicator=True)
+    add(extra[extra['_merge'] == 'left_only'], 'warning', 'judge not assigned',
+        lambda r: f"Judge {r['Judge ID']} for {r['Student Project ID']} not in allowed list {project_dict[r['Student Project ID']]}")
+
+    # a real problem - each project must have enough judges
+    required = assigned.groupby('Student Project ID').size()
+    counts['Required'] = counts['Student Project ID'].map(required).fillna(0).astype(int)
+    add(counts[registered & (counts['Unique'] < counts['Required'])], 'error', 'insufficient judges',
+        lambda r: f"Project {r['Student Project ID']} has {r['Unique']} judges but was assigned {r['Required']}")
+
+    unscored = pd.DataFrame({'Student Project ID': assignments.project_ids.difference(project_ids)})
+    add(unscored, 'info', 'registered but unscored',
+        lambda r: f"Project {r['Student Project ID']} is registered but has no scores (maybe didn't show up)")
+
+    assignment_issues = assignments.issues.rename(columns={'Candidates': 'Judge ID'})
+    add(assignment_issues[~assignment_issues['Resolved']], 'warning', 'unresolved assignment',
+        lambda r: f"{r['Issue']}: '{r['Judge Name']}'" if r['Judge Name'] else r['Issue'])
+    add(assignment_issues[assignment_issues['Resolved']], 'info', 'loose judge name match',
+        lambda r: f"'{r['Judge Name']}' taken as {r['Judge ID']}, {r['Issue']}")
+
+    if not issues:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    issues = pd.concat(issues, ignore_index=True)
+    issues['Severity'] = pd.Categorical(issues['Severity'], categories=SEVERITIES, ordered=True)
+    return issues.sort_values(['Severity', 'Check', 'Student Project ID'], kind='stable').reset_index(drop=True)
+
+
+def verify_validity(final_scores, data_dir, assignments=None, score_rows=None):
+    if assignments is None:
+        assignments = load_judge_assignments(data_dir)
+    if score_rows is None:
+        score_rows = read_score_rows(data_dir)
+
+    with span("validate") as s:
+        issues = find_issues(final_scores, assignments, score_rows)
+        s['rows'] = len(issues)
+    return report_issues(data_dir, issues)
+
+
+def report_issues(data_dir, issues):
+    # logs and saves find_issues() output for the dashboard, True if there are no errors
+    for severity, log in [('error', logger.error), ('warning', logger.warning)]:
+        found = issues[issues['Severity'] == severity]
+        if len(found) > 0:
+            log(f"{len(found)} validity {severity}(s):\n{found.to_string(index=False)}")
+
+    _write_atomic(f"{data_dir}/{VALIDITY_ISSUES_FILE}",
+                  lambda f: issues.to_csv(f, index=False))
+
+    return not (issues['Severity'] == 'error').any()
 
 # utility function, use if you desire
 
 
+def attach_student_names(df, student_assignments):
+    # one join on the normalized project id instead of a lookup per row
+    names = pd.DataFrame({
+        'Student Project ID': student_assignments['ID (project)'].astype(str).str.strip().str.upper(),
+        'Student First Name': student_assignments['Student First Name'],
+        'Student Last Name': student_assignments['Student Last Name'],
+    }).drop_duplicates('Student Project ID').set_index('Student Project ID')
+    df = df.drop(columns=[col for col in names.columns if col in df.columns])
+    joined = df.join(names, on=df['Student Project ID'].astype(str).str.strip().str.upper())
+    missing = joined.loc[joined['Student First Name'].isna() & joined['Student Last Name'].isna(),
+                         'Student Project ID']
+    for project_id in missing:
+        logger.warning(f"Project ID {project_id} not found in student_assignments")
+    return joined
+
+
+def sort_placements(placements):
+    # sort placements by place, then by last name (A-Z)
+    return placements.sort_values(
+        by=['prize winner', 'place', 'Student Last Name'], ascending=[True, False, True], kind='stable')
+
+
 def get_names(data_dir):
     placements = pd.read_csv(f"{data_dir}/placements.csv")
     student_assignments = pd.read_csv(f"{data_dir}/student_assignments.csv")
 
-    placements = placements.drop(columns=['Student Name'])
-    for index, current_row in placements.iterrows():
-        project_id = current_row['Student Project ID']
-        id_row = student_assignments[student_assignments['ID (project)'] == project_id]
-        if len(id_row) == 0:
-            logger.warning(
-                f"Project ID {project_id} not found in student_assignments")
-            continue
-        fname, lname = id_row['Student First Name'].values[0], id_row['Student Last Name'].values[0]
-        # print("fname", fname, "lname", lname)
-        placements.loc[index, 'Student First Name'] = fname
-        placements.loc[index, 'Student Last Name'] = lname
-
-    # sort placements by place, then by last name (A-Z)
-    placements = placements.sort_values(
-        by=['prize winner', 'place', 'Student Last Name'], ascending=[True, False, True])
-    placements.to_csv(f"{data_dir}/placements_new.csv", index=False)
+    placements = attach_student_names(placements.drop(columns=['Student Name']), student_assignments)
+    sort_placements(placements).to_csv(f"{data_dir}/placements_new.csv", index=False)
 
 
 if __name__ == "__main__":
     # sanity check, you can also run the processing logic from here without the UI
     data_dir = "data"
-    final_scores = generate_csv(data_dir)
-    validity_passed = verify_validity(final_scores, data_dir)
+    assignments = load_judge_assignments(data_dir)
+    final_scores = generate_csv(data_dir, assignments)
+    validity_passed = verify_validity(final_scores, data_dir, assignments)
     if validity_passed:
         logger.info("All checks passed!")
     else:
@@ -1,20 +1,18 @@
+from utils import find_issues, load_judge_assignments, read_score_rows
 import pandas as pd
 
 data_dir = "data"
-student_assignments = pd.read_csv(f"{data_dir}/student_assignments.csv")
-id_list = [str(x).strip().upper()
-           for x in student_assignments['ID (project)'].tolist()]
+assignments = load_judge_assignments(data_dir)
+final_scores = pd.read_csv(f"{data_dir}/output.csv", dtype={
+    'Student Project ID': str, 'Judges Had': str})
+final_scores['Student Project ID'] = final_scores['Student Project ID'].str.strip().str.upper()
 
-final_scores = pd.read_csv(f"{data_dir}/output.csv")
-final_scores_list = [str(x).strip().upper()
-                     for x in final_scores['Student Project ID'].tolist()]
+issues = find_issues(final_scores, assignments, read_score_rows(data_dir))
 
 
 # all project IDs are allowed to be scored
-problems = []
-for project_id in final_scores_list:
-    if project_id not in id_list:
-        problems.append(project_id)
+problems = issues.loc[issues['Check'] == 'unregistered project',
+                      'Student Project ID'].tolist()
 
 if len(problems) > 0:
     print(
@@ -22,10 +20,8 @@ if len(problems) > 0:
 else:
     print("All project IDs with scores are registered!")
 
-problems = []
-for project_id in id_list:
-    if project_id not in final_scores_list and project_id != "NAN":
-        problems.append(project_id)
+problems = issues.loc[issues['Check'] == 'registered but unscored',
+                      'Student Project ID'].tolist()
 
 if len(problems) > 0:
     print(